@@ -1,6 +1,8 @@
 import os
 import re
 import json
+import queue
+import threading
 import torch
 import librosa
 import soundfile
@@ -64,65 +66,235 @@ class TTS(nn.Module):
 
     @staticmethod
     def audio_numpy_concat(segment_data_list, sr, speed=1.):
-        audio_segments = []
+        """Concatenate audio segments, each followed by a short silence, into one float32 array"""
+        gap = int((sr * 0.05) / speed)
+        total = sum(segment_data.size for segment_data in segment_data_list) + gap * len(segment_data_list)
+        audio_segments = np.zeros(total, dtype=np.float32)
+        pos = 0
         for segment_data in segment_data_list:
-            audio_segments += segment_data.reshape(-1).tolist()
-            audio_segments += [0] * int((sr * 0.05) / speed)
-        audio_segments = np.array(audio_segments).astype(np.float32)
+            n = segment_data.size
+            audio_segments[pos:pos + n] = segment_data.reshape(-1)
+            pos += n + gap
         return audio_segments
 
     @staticmethod
-    def split_sentences_into_pieces(text, language, quiet=False):
-        texts = split_sentence(text, language_str=language)
+    def split_sentences_into_pieces(text, language, quiet=False, target_phones=None, first_target_phones=None):
+        texts = split_sentence(text, language_str=language, target_phones=target_phones, first_target_phones=first_target_phones)
         if not quiet:
             print(" > Text split to sentences.")
             print('\n'.join(texts))
             print(" > ===========================")
         return texts
 
-    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False,):
-        language = self.language
-        texts = self.split_sentences_into_pieces(text, language, quiet)
-        audio_list = []
+    def _get_progress_iter(self, texts, pbar=None, position=None, quiet=False):
         if pbar:
-            tx = pbar(texts)
-        else:
-            if position:
-                tx = tqdm(texts, position=position)
-            elif quiet:
-                tx = texts
+            return pbar(texts)
+        if position:
+            return tqdm(texts, position=position)
+        if quiet:
+            return texts
+        return tqdm(texts)
+
+    def _prepare_text(self, t):
+        if self.language in ['EN', 'ZH_MIX_EN']:
+            t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
+        return t
+
+    def get_text_features(self, t):
+        return utils.get_text_for_tts_infer(self._prepare_text(t), self.language, self.hps, self.device, self.symbol_to_id)
+
+    def get_text_features_batch(self, texts):
+        """get_text_features for several sentences with one batched BERT pass"""
+        texts = [self._prepare_text(t) for t in texts]
+        return utils.get_text_for_tts_infer_batch(texts, self.language, self.hps, self.device, self.symbol_to_id)
+
+    def _text_features_chunks(self, texts, batch_size=1):
+        for i in range(0, len(texts), batch_size):
+            chunk = texts[i:i + batch_size]
+            if len(chunk) == 1:
+                yield [self.get_text_features(chunk[0])]
             else:
-                tx = tqdm(texts)
-        for t in tx:
-            if language in ['EN', 'ZH_MIX_EN']:
-                t = re.sub(r'([a-z])([A-Z])', r'\1 \2', t)
-            device = self.device
-            bert, ja_bert, phones, tones, lang_ids = utils.get_text_for_tts_infer(t, language, self.hps, device, self.symbol_to_id)
-            with torch.no_grad():
-                x_tst = phones.to(device).unsqueeze(0)
-                tones = tones.to(device).unsqueeze(0)
-                lang_ids = lang_ids.to(device).unsqueeze(0)
-                bert = bert.to(device).unsqueeze(0)
-                ja_bert = ja_bert.to(device).unsqueeze(0)
-                x_tst_lengths = torch.LongTensor([phones.size(0)]).to(device)
-                del phones
-                speakers = torch.LongTensor([speaker_id]).to(device)
-                audio = self.model.infer(
-                        x_tst,
-                        x_tst_lengths,
-                        speakers,
-                        tones,
-                        lang_ids,
-                        bert,
-                        ja_bert,
-                        sdp_ratio=sdp_ratio,
-                        noise_scale=noise_scale,
-                        noise_scale_w=noise_scale_w,
-                        length_scale=1. / speed,
-                    )[0][0, 0].data.cpu().float().numpy()
-                del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers
-                # 
-            audio_list.append(audio)
+                yield self.get_text_features_batch(chunk)
+
+    def iter_text_features(self, texts, prefetch=2, batch_size=1):
+        """Yield `get_text_features(t)` for each text, prepared ahead in a worker thread.
+
+        While the caller runs the synthesizer on sentence N, the frontend (G2P
+        and BERT) already works on the following sentences, at most `prefetch`
+        of them. `prefetch=0` runs the frontend inline. With `batch_size` > 1
+        BERT runs on that many sentences at once.
+        """
+        if prefetch <= 0:
+            for chunk in self._text_features_chunks(texts, batch_size):
+                yield from chunk
+            return
+
+        results = queue.Queue(maxsize=prefetch)
+        stopped = threading.Event()
+        done = object()
+
+        def put(item):
+            while not stopped.is_set():
+                try:
+                    results.put(item, timeout=0.1)
+                    return True
+                except queue.Full:
+                    pass
+            return False
+
+        def worker():
+            try:
+                for chunk in self._text_features_chunks(texts, batch_size):
+                    for features in chunk:
+                        if not put((features, None)):
+                            return
+            except Exception as e:
+                put((None, e))
+                return
+            put((done, None))
+
+        thread = threading.Thread(target=worker, name="tts-frontend", daemon=True)
+        thread.start()
+        try:
+            while True:
+                features, error = results.get()
+                if error is not None:
+                    raise error
+                if features is done:
+                    return
+                yield features
+        finally:
+            # Also reached when the consumer stops early, e.g. a closed stream
+            stopped.set()
+
+    @staticmethod
+    def sentence_seeds(seed, n):
+        """Derive one seed per sentence from a request seed, or None for random synthesis"""
+        if seed is None:
+            return None
+        return [(int(seed) + i) % (2 ** 63) for i in range(n)]
+
+    def infer_features(self, features, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, seed=None):
+        """Run one batched forward pass over the text features of several sentences.
+
+        `features` is a list of (bert, ja_bert, phones, tones, lang_ids) tuples as
+        returned by `get_text_features`, where a BERT stream the language does
+        not use is None. Inputs are zero-padded to the longest sentence and
+        each output is cut to its own `y_mask` length.
+
+        `seed` (an int, or one int per sentence) makes the sampled noise
+        deterministic. The decoder masks each sentence's padding, so identical
+        inputs give the same audio, up to float rounding, regardless of which
+        other sentences share the batch.
+        """
+        device = self.device
+        batch_size = len(features)
+        if isinstance(speaker_id, (list, tuple)):
+            speaker_ids = list(speaker_id)
+        else:
+            speaker_ids = [speaker_id] * batch_size
+        lengths = [f[2].size(0) for f in features]
+        max_len = max(lengths)
+        generators = None
+        if seed is not None:
+            seeds = list(seed) if isinstance(seed, (list, tuple)) else [seed] * batch_size
+            generators = []
+            for s in seeds:
+                generator = torch.Generator()
+                if s is None:
+                    generator.seed()
+                else:
+                    generator.manual_seed(int(s))
+                generators.append(generator)
+
+        x_tst = torch.zeros(batch_size, max_len, dtype=torch.long)
+        tones = torch.zeros(batch_size, max_len, dtype=torch.long)
+        lang_ids = torch.zeros(batch_size, max_len, dtype=torch.long)
+        # BERT features may already live on the model device, so pad them there
+        bert = None
+        if features[0][0] is not None:
+            bert = torch.zeros(batch_size, features[0][0].size(0), max_len, device=device)
+        ja_bert = None
+        if features[0][1] is not None:
+            ja_bert = torch.zeros(batch_size, features[0][1].size(0), max_len, device=device)
+        for i, (b, jb, ph, tn, lg) in enumerate(features):
+            n = lengths[i]
+            x_tst[i, :n] = ph
+            tones[i, :n] = tn
+            lang_ids[i, :n] = lg
+            if bert is not None:
+                bert[i, :, :n] = b
+            if ja_bert is not None:
+                ja_bert[i, :, :n] = jb
+
+        with torch.no_grad():
+            x_tst = x_tst.to(device)
+            tones = tones.to(device)
+            lang_ids = lang_ids.to(device)
+            x_tst_lengths = torch.LongTensor(lengths).to(device)
+            speakers = torch.LongTensor(speaker_ids).to(device)
+            o, _, y_mask, _ = self.model.infer(
+                    x_tst,
+                    x_tst_lengths,
+                    speakers,
+                    tones,
+                    lang_ids,
+                    bert,
+                    ja_bert,
+                    sdp_ratio=sdp_ratio,
+                    noise_scale=noise_scale,
+                    noise_scale_w=noise_scale_w,
+                    length_scale=1. / speed,
+                    generator=generators,
+                )
+            audio_lengths = (y_mask.sum([1, 2]).long() * self.hps.data.hop_length).tolist()
+            o = o[:, 0].data.cpu().float().numpy()
+            del x_tst, tones, lang_ids, bert, ja_bert, x_tst_lengths, speakers, y_mask
+        return [o[i, :audio_lengths[i]] for i in range(batch_size)]
+
+    def infer_sentence(self, t, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, seed=None):
+        return self.infer_batch([t], speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, seed=seed)[0]
+
+    def infer_batch(self, texts, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, seed=None):
+        features = self.get_text_features_batch(texts) if len(texts) > 1 else [self.get_text_features(texts[0])]
+        return self.infer_features(features, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, seed=seed)
+
+    def tts_stream(self, text, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, position=None, quiet=False, seed=None, prefetch=2, target_phones=None, first_target_phones=None,):
+        """Yield float32 audio for each sentence of `text` as soon as it is synthesized.
+
+        Every chunk is followed by the same inter-sentence silence that
+        `audio_numpy_concat` inserts, so concatenating the chunks gives the
+        audio `tts_to_file` would have produced with the same splitting.
+        """
+        language = self.language
+        texts = self.split_sentences_into_pieces(text, language, quiet, target_phones, first_target_phones)
+        sr = self.hps.data.sampling_rate
+        seeds = self.sentence_seeds(seed, len(texts)) or [None] * len(texts)
+        features = self.iter_text_features(texts, prefetch=prefetch)
+        try:
+            for _, f, s in zip(self._get_progress_iter(texts, pbar, position, quiet), features, seeds):
+                audio = self.infer_features([f], speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, seed=s)[0]
+                yield self.audio_numpy_concat([audio], sr=sr, speed=speed)
+        finally:
+            # Stops the frontend thread when inference fails or the caller stops early
+            features.close()
+        torch.cuda.empty_cache()
+
+    def tts_to_file(self, text, speaker_id, output_path=None, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, pbar=None, format=None, position=None, quiet=False, batch_size=1, seed=None, prefetch=2, target_phones=None, first_target_phones=None,):
+        language = self.language
+        texts = self.split_sentences_into_pieces(text, language, quiet, target_phones, first_target_phones)
+        seeds = self.sentence_seeds(seed, len(texts))
+        batches = [range(i, min(i + batch_size, len(texts))) for i in range(0, len(texts), batch_size)]
+        # The frontend prepares the next sentences while the model runs on the current batch
+        features = self.iter_text_features(texts, prefetch=max(prefetch, batch_size) if prefetch > 0 else 0, batch_size=batch_size)
+        audio_list = []
+        try:
+            for batch in self._get_progress_iter(batches, pbar, position, quiet):
+                batch_seeds = [seeds[i] for i in batch] if seeds else None
+                batch_features = [next(features) for _ in batch]
+                audio_list += self.infer_features(batch_features, speaker_id, sdp_ratio=sdp_ratio, noise_scale=noise_scale, noise_scale_w=noise_scale_w, speed=speed, seed=batch_seeds)
+        finally:
+            features.close()
         torch.cuda.empty_cache()
         audio = self.audio_numpy_concat(audio_list, sr=self.hps.data.sampling_rate, speed=speed)
 
@@ -1,4 +1,5 @@
 import math
+import numpy as np
 import torch
 from torch.nn import functional as F
 
@@ -25,6 +26,13 @@ def intersperse(lst, item):
     return result
 
 
+def intersperse_array(arr, item):
+    """intersperse for a numpy array, returns an array of the same dtype"""
+    result = np.full(len(arr) * 2 + 1, item, dtype=arr.dtype)
+    result[1::2] = arr
+    return result
+
+
 def kl_divergence(m_p, logs_p, m_q, logs_q):
     """KL(P||Q)"""
     kl = (logs_q - logs_p) - 0.5
@@ -45,6 +53,29 @@ def rand_gumbel_like(x):
     return g
 
 
+def seeded_randn(size, generator=None, mask=None, device=None, dtype=None):
+    """Standard normal noise of shape [b, c, t], optionally drawn from seeded generators.
+
+    `generator` may be a single torch.Generator or one per sample. With one per
+    sample, sample i only draws noise for its unmasked frames, so its values do
+    not depend on how much padding the batch added.
+    """
+    if generator is None:
+        return torch.randn(size).to(device=device, dtype=dtype)
+    if isinstance(generator, torch.Generator):
+        return torch.randn(size, generator=generator, device=generator.device).to(
+            device=device, dtype=dtype
+        )
+    b, c, t = size
+    lengths = mask.sum([1, 2]).long().tolist() if mask is not None else [t] * b
+    noise = torch.zeros(size, device=device, dtype=dtype)
+    for i, g in enumerate(generator):
+        noise[i, :, : lengths[i]] = torch.randn(
+            c, lengths[i], generator=g, device=g.device
+        ).to(device=device, dtype=dtype)
+    return noise
+
+
 def slice_segments(x, ids_str, segment_size=4):
     ret = torch.zeros_like(x[:, :, :segment_size])
     for i in range(x.size(0)):
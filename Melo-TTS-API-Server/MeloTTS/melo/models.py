@@ -203,7 +203,7 @@ class StochasticDurationPredictor(nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, filter_channels, 1)
 
-    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0):
+    def forward(self, x, x_mask, w=None, g=None, reverse=False, noise_scale=1.0, generator=None):
         x = torch.detach(x)
         x = self.pre(x)
         if g is not None:
@@ -255,7 +255,13 @@ class StochasticDurationPredictor(nn.Module):
             flows = list(reversed(self.flows))
             flows = flows[:-2] + [flows[-1]]  # remove a useless vflow
             z = (
-                torch.randn(x.size(0), 2, x.size(2)).to(device=x.device, dtype=x.dtype)
+                commons.seeded_randn(
+                    (x.size(0), 2, x.size(2)),
+                    generator=generator,
+                    mask=x_mask,
+                    device=x.device,
+                    dtype=x.dtype,
+                )
                 * noise_scale
             )
             for flow in flows:
@@ -358,8 +364,10 @@ class TextEncoder(nn.Module):
         self.proj = nn.Conv1d(hidden_channels, out_channels * 2, 1)
 
     def forward(self, x, x_lengths, tone, language, bert, ja_bert, g=None):
-        bert_emb = self.bert_proj(bert).transpose(1, 2)
-        ja_bert_emb = self.ja_bert_proj(ja_bert).transpose(1, 2)
+        # bert / ja_bert may be None for a stream the language does not use.
+        # Zero features project to the conv's bias, so that is added instead.
+        bert_emb = self.bert_proj.bias if bert is None else self.bert_proj(bert).transpose(1, 2)
+        ja_bert_emb = self.ja_bert_proj.bias if ja_bert is None else self.ja_bert_proj(ja_bert).transpose(1, 2)
         x = (
             self.emb(x)
             + self.tone_emb(tone)
@@ -483,6 +491,7 @@ class Generator(torch.nn.Module):
         super(Generator, self).__init__()
         self.num_kernels = len(resblock_kernel_sizes)
         self.num_upsamples = len(upsample_rates)
+        self.upsample_rates = list(upsample_rates)
         self.conv_pre = Conv1d(
             initial_channel, upsample_initial_channel, 7, 1, padding=3
         )
@@ -516,20 +525,26 @@ class Generator(torch.nn.Module):
         if gin_channels != 0:
             self.cond = nn.Conv1d(gin_channels, upsample_initial_channel, 1)
 
-    def forward(self, x, g=None):
+    def forward(self, x, g=None, x_mask=None):
+        # With x_mask, the frames past each item's length are zeroed before every
+        # convolution, like the zero padding the item would get on its own, so
+        # padding in a batch does not leak into the end of shorter items.
         x = self.conv_pre(x)
         if g is not None:
             x = x + self.cond(g)
 
         for i in range(self.num_upsamples):
             x = F.leaky_relu(x, modules.LRELU_SLOPE)
+            if x_mask is not None:
+                x = x * x_mask
+                x_mask = torch.repeat_interleave(x_mask, self.upsample_rates[i], dim=2)
             x = self.ups[i](x)
             xs = None
             for j in range(self.num_kernels):
                 if xs is None:
-                    xs = self.resblocks[i * self.num_kernels + j](x)
+                    xs = self.resblocks[i * self.num_kernels + j](x, x_mask)
                 else:
-                    xs += self.resblocks[i * self.num_kernels + j](x)
+                    xs += self.resblocks[i * self.num_kernels + j](x, x_mask)
             x = xs / self.num_kernels
         x = F.leaky_relu(x)
         x = self.conv_post(x)
@@ -979,6 +994,7 @@ class SynthesizerTrn(nn.Module):
         sdp_ratio=0,
         y=None,
         g=None,
+        generator=None,
     ):
         # x, m_p, logs_p, x_mask = self.enc_p(x, x_lengths, tone, language, bert)
         # g = self.gst(y)
@@ -994,9 +1010,9 @@ class SynthesizerTrn(nn.Module):
         x, m_p, logs_p, x_mask = self.enc_p(
             x, x_lengths, tone, language, bert, ja_bert, g=g_p
         )
-        logw = self.sdp(x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w) * (
-            sdp_ratio
-        ) + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
+        logw = self.sdp(
+            x, x_mask, g=g, reverse=True, noise_scale=noise_scale_w, generator=generator
+        ) * sdp_ratio + self.dp(x, x_mask, g=g) * (1 - sdp_ratio)
         w = torch.exp(logw) * x_mask * length_scale
         
         w_ceil = torch.ceil(w)
@@ -1014,9 +1030,19 @@ class SynthesizerTrn(nn.Module):
             1, 2
         )  # [b, t', t], [b, t, d] -> [b, d, t']
 
-        z_p = m_p + torch.randn_like(m_p) * torch.exp(logs_p) * noise_scale
+        if generator is None:
+            noise = torch.randn_like(m_p)
+        else:
+            noise = commons.seeded_randn(
+                m_p.size(),
+                generator=generator,
+                mask=y_mask,
+                device=m_p.device,
+                dtype=m_p.dtype,
+            )
+        z_p = m_p + noise * torch.exp(logs_p) * noise_scale
         z = self.flow(z_p, y_mask, g=g, reverse=True)
-        o = self.dec((z * y_mask)[:, :, :max_len], g=g)
+        o = self.dec((z * y_mask)[:, :, :max_len], g=g, x_mask=y_mask[:, :, :max_len])
         # print('max/min of o:', o.max(), o.min())
         return o, attn, y_mask, (z, z_p, m_p, logs_p)
 
@@ -5,7 +5,7 @@ from typing import Optional
 
 from tqdm import tqdm
 import click
-from text.cleaner import clean_text_bert
+from text.cleaner import clean_text_bert, clean_text_bert_batch
 import os
 import torch
 from text.symbols import symbols, num_languages, num_tones
@@ -27,6 +27,7 @@ from text.symbols import symbols, num_languages, num_tones
 @click.option("--val-per-spk", default=4)
 @click.option("--max-val-total", default=8)
 @click.option("--clean/--no-clean", default=True)
+@click.option("--bert-batch-size", default=16, help="Number of lines of the same language to run through BERT at once")
 def main(
     metadata: str,
     cleaned_path: Optional[str],
@@ -36,6 +37,7 @@ def main(
     val_per_spk: int,
     max_val_total: int,
     clean: bool,
+    bert_batch_size: int,
 ):
     if train_path is None:
         train_path = os.path.join(os.path.dirname(metadata), 'train.list')
@@ -49,36 +51,65 @@ def main(
     if clean:
         out_file = open(cleaned_path, "w", encoding="utf-8")
         new_symbols = []
+
+        def write_cleaned(line, cleaned):
+            utt, spk, language, text = line.strip().split("|")
+            norm_text, phones, tones, word2ph, bert = cleaned
+            for ph in phones:
+                if ph not in symbols and ph not in new_symbols:
+                    new_symbols.append(ph)
+                    print('update!, now symbols:')
+                    print(new_symbols)
+                    with open(f'{language}_symbol.txt', 'w') as f:
+                        f.write(f'{new_symbols}')
+
+            assert len(phones) == len(tones)
+            assert len(phones) == sum(word2ph)
+            out_file.write(
+                "{}|{}|{}|{}|{}|{}|{}\n".format(
+                    utt,
+                    spk,
+                    language,
+                    norm_text,
+                    " ".join(phones),
+                    " ".join([str(i) for i in tones]),
+                    " ".join([str(i) for i in word2ph]),
+                )
+            )
+            bert_path = utt.replace(".wav", ".bert.pt")
+            os.makedirs(os.path.dirname(bert_path), exist_ok=True)
+            torch.save(bert.cpu(), bert_path)
+
+        def process_batch(lines, language):
+            try:
+                texts = [line.strip().split("|")[3] for line in lines]
+                results = clean_text_bert_batch(texts, language, device='cuda:0')
+            except Exception:
+                # Redo the lines one by one so only the broken ones are reported
+                results = [None] * len(lines)
+            for line, cleaned in zip(lines, results):
+                try:
+                    if cleaned is None:
+                        text = line.strip().split("|")[3]
+                        cleaned = clean_text_bert(text, language, device='cuda:0')
+                    write_cleaned(line, cleaned)
+                except Exception as error:
+                    print("err!", line, error)
+
+        batch, batch_language = [], None
         for line in tqdm(open(metadata, encoding="utf-8").readlines()):
             try:
                 utt, spk, language, text = line.strip().split("|")
-                norm_text, phones, tones, word2ph, bert = clean_text_bert(text, language, device='cuda:0')
-                for ph in phones:
-                    if ph not in symbols and ph not in new_symbols:
-                        new_symbols.append(ph)
-                        print('update!, now symbols:')
-                        print(new_symbols)
-                        with open(f'{language}_symbol.txt', 'w') as f:
-                            f.write(f'{new_symbols}')
-
-                assert len(phones) == len(tones)
-                assert len(phones) == sum(word2ph)
-                out_file.write(
-                    "{}|{}|{}|{}|{}|{}|{}\n".format(
-                        utt,
-                        spk,
-                        language,
-                        norm_text,
-                        " ".join(phones),
-                        " ".join([str(i) for i in tones]),
-                        " ".join([str(i) for i in word2ph]),
-                    )
-                )
-                bert_path = utt.replace(".wav", ".bert.pt")
-                os.makedirs(os.path.dirname(bert_path), exist_ok=True)
-                torch.save(bert.cpu(), bert_path)
             except Exception as error:
                 print("err!", line, error)
+                continue
+            if batch and (language != batch_language or len(batch) >= bert_batch_size):
+                process_batch(batch, batch_language)
+                batch = []
+            batch.append(line)
+            batch_language = language
+        if batch:
+            process_batch(batch, batch_language)
 
         out_file.close()
 
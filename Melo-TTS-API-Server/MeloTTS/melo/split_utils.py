@@ -6,21 +6,45 @@ import soundfile as sf
 import torchaudio
 import re
 
-def split_sentence(text, min_len=10, language_str='EN'):
-    if language_str in ['EN', 'FR', 'ES', 'SP']:
+LATIN_LANGUAGES = ['EN', 'FR', 'ES', 'SP']
+
+
+def split_sentence(text, min_len=10, language_str='EN', target_phones=None, first_target_phones=None):
+    """Split text into the pieces synthesized one at a time.
+
+    With `target_phones` the clauses are packed into pieces of about that many
+    phones instead, so pieces batched together need little padding, and the
+    first piece holds at most about `first_target_phones` phones when given,
+    so the first audio is ready sooner.
+    """
+    if target_phones is not None:
+        clauses = split_clauses(text, language_str, target_phones)
+        return pack_sentences(clauses, language_str, target_phones, first_target_phones)
+    if language_str in LATIN_LANGUAGES:
         sentences = split_sentences_latin(text, min_len=min_len)
     else:
         sentences = split_sentences_zh(text, min_len=min_len)
     return sentences
 
 
-def split_sentences_latin(text, min_len=10):
-    text = re.sub('[。！？；]', '.', text)
-    text = re.sub('[，]', ',', text)
-    text = re.sub('[“”]', '"', text)
-    text = re.sub('[‘’]', "'", text)
-    text = re.sub(r"[\<\>\(\)\[\]\"\«\»]+", "", text)
-    return [item.strip() for item in txtsplit(text, 256, 512) if item.strip()]
+# 。！？； -> ., ， -> ,, curly quotes -> straight ones, then brackets and double quotes dropped
+_LATIN_TRANSLATION = str.maketrans({
+    **{c: '.' for c in '。！？；'},
+    '，': ',',
+    **{c: "'" for c in '‘’'},
+    **{c: None for c in '“”<>()[]"«»'},
+})
+
+
+def split_sentences_latin(text, min_len=10, desired_length=256, max_length=512):
+    return list(split_sentences_latin_stream([text], min_len=min_len, desired_length=desired_length, max_length=max_length))
+
+
+def split_sentences_latin_stream(fragments, min_len=10, desired_length=256, max_length=512):
+    """Like split_sentences_latin for text arriving in fragments, yielding each sentence once it is closed"""
+    fragments = (fragment.translate(_LATIN_TRANSLATION) for fragment in fragments)
+    for item in txtsplit_stream(fragments, desired_length, max_length):
+        yield item
 
 
 def split_sentences_zh(text, min_len=10):
@@ -101,65 +125,184 @@ def merge_short_sentences_zh(sens):
     return sens_out
 
 
+# Phones per character of text, for (narrow, wide) characters. Wide characters
+# are CJK, kana and hangul. Measured on the example corpora with each
+# language's G2P, only used to balance pieces so rough values are enough.
+PHONES_PER_CHAR = {
+    'EN': (0.85, 2.0),
+    'FR': (0.8, 2.0),
+    'ES': (0.95, 2.0),
+    'SP': (0.95, 2.0),
+    'ZH': (0.85, 1.9),
+    'ZH_MIX_EN': (0.85, 1.9),
+    'JP': (0.85, 2.3),
+    'KR': (0.85, 2.4),
+}
+_WIDE_CHAR_RE = re.compile(r'[\u2e80-\ud7ff\uf900-\uffef]')
+_NON_SPACE_RE = re.compile(r'\S')
+
+
+def estimate_phones(text, language_str='EN'):
+    """Estimate the number of phones G2P produces for text, without running it"""
+    narrow_rate, wide_rate = PHONES_PER_CHAR.get(language_str, PHONES_PER_CHAR['EN'])
+    wide = len(_WIDE_CHAR_RE.findall(text))
+    narrow = len(_NON_SPACE_RE.findall(text)) - wide
+    return narrow * narrow_rate + wide * wide_rate
+
+
+def split_clauses(text, language_str='EN', max_phones=None):
+    """Split text after every sentence and clause, clauses of Latin languages are cut to about `max_phones`"""
+    if language_str in LATIN_LANGUAGES:
+        max_length = 512
+        if max_phones is not None:
+            max_length = max(2, int(max_phones / PHONES_PER_CHAR[language_str][0]))
+        return split_sentences_latin(text, desired_length=1, max_length=max_length)
+    return split_sentences_zh(text, min_len=0)
+
+
+def pack_sentences(sentences, language_str='EN', target_phones=100, first_target_phones=None):
+    """Join consecutive sentences into pieces of about `target_phones` estimated phones.
+
+    Each piece aims at an equal share of the text that is left, so the pieces
+    come out balanced instead of full ones followed by a short remainder. With `first_target_phones` the
+    first piece is closed as soon as it holds about that many phones.
+    """
+    if target_phones <= 0:
+        raise ValueError(f"target_phones must be positive, got {target_phones}")
+    if first_target_phones is not None and first_target_phones <= 0:
+        raise ValueError(f"first_target_phones must be positive, got {first_target_phones}")
+    costs = [estimate_phones(s, language_str) for s in sentences]
+    pieces = []
+    i = 0
+    if first_target_phones is not None and sentences:
+        cost = costs[0]
+        j = 1
+        while j < len(sentences) and cost + costs[j] / 2 <= first_target_phones:
+            cost += costs[j]
+            j += 1
+        pieces.append(' '.join(sentences[:j]))
+        i = j
+    remaining = sum(costs[i:])
+    while i < len(sentences):
+        # Each piece aims at an equal share of the phones that are left
+        target = remaining / max(1, round(remaining / target_phones))
+        cost = costs[i]
+        j = i + 1
+        while j < len(sentences) and cost + costs[j] / 2 <= target:
+            cost += costs[j]
+            j += 1
+        pieces.append(' '.join(sentences[i:j]))
+        remaining -= cost
+        i = j
+    return pieces
+
+
+_SPACE_RE = re.compile(r'\s+')
+_PUNCT_RE = re.compile(r'([,.?!])')
+_EMPTY_CHUNK_RE = re.compile(r'^[\s\.,;:!?]*$')
+
+
+def _normalize_fragment(text):
+    # A space after every punctuation mark and whitespace runs collapsed to one space
+    return _SPACE_RE.sub(' ', _PUNCT_RE.sub(r'\1 ', text))
+
 
 def txtsplit(text, desired_length=100, max_length=200):
     """Split text it into chunks of a desired length trying to keep sentences intact."""
-    text = re.sub(r'\n\n+', '\n', text)
-    text = re.sub(r'\s+', ' ', text)
-    text = re.sub(r'[""]', '"', text)
-    text = re.sub(r'([,.?!])', r'\1 ', text)
-    text = re.sub(r'\s+', ' ', text)
-    
-    rv = []
+    return list(txtsplit_stream([text], desired_length, max_length))
+
+
+def txtsplit_stream(fragments, desired_length=100, max_length=200):
+    """txtsplit over text arriving in fragments, yielding each chunk as soon as it is closed.
+
+    The text is scanned once with indices into a buffer that only keeps the
+    current chunk and the text not read yet. A character is only scanned once
+    enough text follows it to take the same decision txtsplit takes on the
+    whole text, so the chunks don't depend on how the text is fragmented.
+    """
+    buf = ""
+    ended = False
+    start = 0  # first character of the current chunk
+    pos = -1
+    c = ""
     in_quote = False
-    current = ""
     split_pos = []
-    pos = -1
-    end_pos = len(text) - 1
+
     def seek(delta):
-        nonlocal pos, in_quote, current
-        is_neg = delta < 0
+        nonlocal pos, in_quote
+        step = 1 if delta > 0 else -1
         for _ in range(abs(delta)):
-            if is_neg:
-                pos -= 1
-                current = current[:-1]
-            else:
-                pos += 1
-                current += text[pos]
-            if text[pos] == '"':
+            pos += step
+            if buf[pos] == '"':
                 in_quote = not in_quote
-        return text[pos]
+        return buf[pos]
+
     def peek(delta):
         p = pos + delta
-        return text[p] if p < end_pos and p >= 0 else ""
+        return buf[p] if p < len(buf) - 1 and p >= 0 else ""
+
+    def scan_limit():
+        # Characters before the limit can be scanned: the next step reads up to
+        # 3 characters ahead, plus a run of !?. and peek() treats the last
+        # character of the text as past its end
+        if ended:
+            return len(buf) - 1
+        run_start = len(buf) - 1
+        while run_start > 0 and buf[run_start - 1] in '!?.':
+            run_start -= 1
+        return min(len(buf) - 4, run_start - 2)
+
     def commit():
-        nonlocal rv, current, split_pos
-        rv.append(current)
-        current = ""
+        nonlocal start, split_pos
+        chunk = buf[start:pos + 1]
+        start = pos + 1
         split_pos = []
-    while pos < end_pos:
-        c = seek(1)
-        if len(current) >= max_length:
-            if len(split_pos) > 0 and len(current) > (desired_length / 2):
-                d = pos - split_pos[-1]
-                seek(-d)
-            else:
-                while c not in '!?.\n ' and pos > 0 and len(current) > desired_length:
-                    c = seek(-1)
-            commit()
-        elif not in_quote and (c in '!?\n' or (c in '.,' and peek(1) in '\n ')):
-            while pos < len(text) - 1 and len(current) < max_length and peek(1) in '!?.':
-                c = seek(1)
-            split_pos.append(pos)
-            if len(current) >= desired_length:
-                commit()
-        elif in_quote and peek(1) == '"' and peek(2) in '\n ':
-            seek(2)
-            split_pos.append(pos)
-    rv.append(current)
-    rv = [s.strip() for s in rv]
-    rv = [s for s in rv if len(s) > 0 and not re.match(r'^[\s\.,;:!?]*$', s)]
-    return rv
+        return chunk
+
+    def run():
+        nonlocal c
+        limit = scan_limit()
+        while pos < limit:
+            c = seek(1)
+            if pos + 1 - start >= max_length:
+                if len(split_pos) > 0 and pos + 1 - start > (desired_length / 2):
+                    d = pos - split_pos[-1]
+                    seek(-d)
+                else:
+                    while c not in '!?.\n ' and pos > 0 and pos + 1 - start > desired_length:
+                        c = seek(-1)
+                yield commit()
+            elif not in_quote and (c in '!?\n' or (c in '.,' and peek(1) in '\n ')):
+                while pos < len(buf) - 1 and pos + 1 - start < max_length and peek(1) in '!?.':
+                    c = seek(1)
+                split_pos.append(pos)
+                if pos + 1 - start >= desired_length:
+                    yield commit()
+            elif in_quote and peek(1) == '"' and peek(2) in '\n ':
+                seek(2)
+                split_pos.append(pos)
+
+    def closed(chunks):
+        for chunk in chunks:
+            chunk = chunk.strip()
+            if len(chunk) > 0 and not _EMPTY_CHUNK_RE.match(chunk):
+                yield chunk
+
+    for fragment in fragments:
+        fragment = _normalize_fragment(fragment)
+        if buf.endswith(' ') and fragment.startswith(' '):
+            fragment = fragment[1:]
+        # Drop the committed text once it is most of the buffer, positions move with it
+        if start > len(buf) // 2:
+            buf = buf[start:]
+            pos -= start
+            split_pos = [p - start for p in split_pos]
+            start = 0
+        buf += fragment
+        yield from closed(run())
+    ended = True
+    yield from closed(run())
+    yield from closed([buf[start:pos + 1]])
 
 
 if __name__ == '__main__':
@@ -1,3 +1,7 @@
+import importlib
+
+import numpy as np
+
 from .symbols import *
 
 
@@ -20,16 +24,64 @@ def cleaned_text_to_sequence(cleaned_text, tones, language, symbol_to_id=None):
     return phones, tones, lang_ids
 
 
+def cleaned_text_to_arrays(cleaned_text, tones, language, symbol_to_id=None):
+    """cleaned_text_to_sequence returning int64 numpy arrays, ready for torch.from_numpy"""
+    symbol_to_id_map = symbol_to_id if symbol_to_id else _symbol_to_id
+    phones = np.fromiter(map(symbol_to_id_map.__getitem__, cleaned_text), dtype=np.int64, count=len(cleaned_text))
+    tones = np.asarray(tones, dtype=np.int64) + language_tone_start_map[language]
+    lang_ids = np.full(len(phones), language_id_map[language], dtype=np.int64)
+    return phones, tones, lang_ids
+
+
+# Text frontend and BERT feature module of each language. They pull in heavy
+# dependencies (jieba, MeCab, g2p_en, gruut, ...), so they are only imported
+# when a language is first used.
+LANGUAGE_FRONTENDS = {
+    "ZH": "chinese",
+    "JP": "japanese",
+    "EN": "english",
+    "ZH_MIX_EN": "chinese_mix",
+    "KR": "korean",
+    "FR": "french",
+    "SP": "spanish",
+    "ES": "spanish",
+}
+LANGUAGE_BERT_MODULES = {
+    "ZH": "chinese_bert",
+    "JP": "japanese_bert",
+    "EN": "english_bert",
+    "ZH_MIX_EN": "chinese_mix",
+    "KR": "korean",
+    "FR": "french_bert",
+    "SP": "spanish_bert",
+    "ES": "spanish_bert",
+}
+
+
+def register_language(language, frontend, bert_module=None):
+    """Add or replace a language. Plain module names are looked up in melo.text, dotted ones are absolute."""
+    LANGUAGE_FRONTENDS[language] = frontend
+    LANGUAGE_BERT_MODULES[language] = bert_module or frontend
+
+
+def _import(name):
+    return importlib.import_module(name if "." in name else f".{name}", __name__)
+
+
+def get_frontend(language):
+    """Text frontend module (text_normalize, g2p) of a language"""
+    return _import(LANGUAGE_FRONTENDS[language])
+
+
+def get_bert_module(language):
+    """Module providing get_bert_feature / get_bert_feature_batch for a language"""
+    return _import(LANGUAGE_BERT_MODULES[language])
+
+
 def get_bert(norm_text, word2ph, language, device):
-    from .chinese_bert import get_bert_feature as zh_bert
-    from .english_bert import get_bert_feature as en_bert
-    from .japanese_bert import get_bert_feature as jp_bert
-    from .chinese_mix import get_bert_feature as zh_mix_en_bert
-    from .spanish_bert import get_bert_feature as sp_bert
-    from .french_bert import get_bert_feature as fr_bert
-    from .korean import get_bert_feature as kr_bert
-
-    lang_bert_func_map = {"ZH": zh_bert, "EN": en_bert, "JP": jp_bert, 'ZH_MIX_EN': zh_mix_en_bert, 
-                          'FR': fr_bert, 'SP': sp_bert, 'ES': sp_bert, "KR": kr_bert}
-    bert = lang_bert_func_map[language](norm_text, word2ph, device)
-    return bert
+    return get_bert_module(language).get_bert_feature(norm_text, word2ph, device)
+
+
+def get_bert_batch(norm_texts, word2phs, language, device):
+    """Like get_bert, but runs one padded BERT forward pass for several sentences."""
+    return get_bert_module(language).get_bert_feature_batch(norm_texts, word2phs, device)
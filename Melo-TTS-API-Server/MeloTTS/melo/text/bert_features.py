@@ -0,0 +1,47 @@
+import torch
+from transformers import AutoModel
+
+# The text encoder is trained on the output of the third layer from the top
+# (hidden_states[-3] of the masked LM), so the last two layers are never used
+FEATURE_LAYER = -3
+
+
+class BertFeatureExtractor(torch.nn.Module):
+    """Bare BERT encoder cut after the layer used for TTS features.
+
+    Loads the checkpoint without the masked-LM head and pooler and drops the
+    encoder layers above FEATURE_LAYER, so `forward` returns exactly what
+    `AutoModelForMaskedLM(..., output_hidden_states=True)["hidden_states"][-3]`
+    used to, without computing the vocabulary logits or keeping every layer's
+    activations around.
+    """
+
+    def __init__(self, encoder, feature_layer=FEATURE_LAYER):
+        super().__init__()
+        layers = encoder.encoder.layer
+        keep = len(layers) + feature_layer + 1
+        encoder.encoder.layer = layers[:keep]
+        encoder.config.num_hidden_layers = keep
+        self.encoder = encoder
+
+    @classmethod
+    def from_pretrained(cls, model_id, feature_layer=FEATURE_LAYER):
+        encoder = AutoModel.from_pretrained(model_id, add_pooling_layer=False)
+        return cls(encoder, feature_layer=feature_layer).eval()
+
+    def forward(self, input_ids, attention_mask=None, token_type_ids=None):
+        return self.encoder(
+            input_ids=input_ids,
+            attention_mask=attention_mask,
+            token_type_ids=token_type_ids,
+        ).last_hidden_state.float()
+
+
+def expand_to_phones(features, word2ph):
+    """Repeat each token's feature vector word2ph[i] times.
+
+    `features` is [n_tokens, C] (padding past len(word2ph) is ignored) and the
+    result is the phone level [C, sum(word2ph)] on the same device.
+    """
+    repeats = torch.as_tensor(word2ph, dtype=torch.long, device=features.device)
+    return torch.repeat_interleave(features[: len(repeats)], repeats, dim=0).T
@@ -0,0 +1,189 @@
+import logging
+import sys
+import threading
+from collections import OrderedDict
+
+import torch
+from transformers import AutoTokenizer
+
+from .bert_features import BertFeatureExtractor
+
+logger = logging.getLogger(__name__)
+
+# Checkpoint each language's BERT features (and word-piece groups) come from
+LANGUAGE_MODELS = {
+    'ZH': 'hfl/chinese-roberta-wwm-ext-large',
+    'ZH_MIX_EN': 'bert-base-multilingual-uncased',
+    'EN': 'bert-base-uncased',
+    'JP': 'tohoku-nlp/bert-base-japanese-v3',
+    'KR': 'kykim/bert-kor-base',
+    'FR': 'dbmdz/bert-base-french-europeana-cased',
+    'SP': 'dccuchile/bert-base-spanish-wwm-uncased',
+    'ES': 'dccuchile/bert-base-spanish-wwm-uncased',
+}
+
+DTYPES = ('fp32', 'bf16', 'int8')
+
+
+def _tensor_bytes(obj):
+    if torch.is_tensor(obj):
+        return obj.numel() * obj.element_size()
+    if isinstance(obj, (tuple, list)):
+        return sum(_tensor_bytes(o) for o in obj)
+    return 0
+
+
+def model_bytes(model):
+    """Bytes held by a model's weights and buffers, including int8 packed weights"""
+    return sum(_tensor_bytes(t) for t in model.state_dict().values())
+
+
+class BertRegistry:
+    """Loads BERT tokenizers and feature encoders on first use and shares them.
+
+    Tokenizers are small and kept for the life of the process. Encoders are
+    keyed by (model_id, device, dtype) and kept in LRU order; once more than
+    `max_models` are loaded, or they hold more than `max_bytes` of weights, the
+    least recently used ones are dropped. The encoder that was just requested
+    is never evicted.
+
+    `device` defaults to the one the caller asks for, then to CUDA when it is
+    available; configuring one overrides what callers pass.
+    `dtype` is 'fp32', 'bf16' or 'int8'. int8 uses dynamic quantization of the
+    linear layers and only runs on the CPU. Features are returned as float32
+    whatever the dtype, since the TTS model expects that.
+    """
+
+    def __init__(self, device=None, dtype='fp32', max_models=None, max_bytes=None):
+        self._tokenizers = {}
+        self._models = OrderedDict()
+        self._lock = threading.RLock()
+        self.loads = 0
+        self.evictions = 0
+        self.device = None
+        self.dtype = 'fp32'
+        self.max_models = None
+        self.max_bytes = None
+        self.configure(device=device, dtype=dtype, max_models=max_models, max_bytes=max_bytes)
+
+    def configure(self, device=None, dtype=None, max_models=None, max_bytes=None):
+        """Change the defaults. Limits of 0 mean unlimited; loaded encoders over a new limit go on the next load"""
+        if dtype is not None and dtype not in DTYPES:
+            raise ValueError(f"Unsupported BERT dtype {dtype!r}, expected one of {DTYPES}")
+        with self._lock:
+            if device is not None:
+                self.device = device
+            if dtype is not None:
+                self.dtype = dtype
+            if max_models is not None:
+                self.max_models = int(max_models) or None
+            if max_bytes is not None:
+                self.max_bytes = int(max_bytes) or None
+
+    def resolve_device(self, device=None):
+        # A configured device pins every encoder, e.g. BERT on the CPU next to a GPU TTS model
+        device = self.device or device
+        if not device:
+            device = 'cuda' if torch.cuda.is_available() else 'cpu'
+        if (
+            sys.platform == "darwin"
+            and torch.backends.mps.is_available()
+            and device == "cpu"
+        ):
+            device = "mps"
+        return device
+
+    def get_tokenizer(self, model_id):
+        with self._lock:
+            tokenizer = self._tokenizers.get(model_id)
+            if tokenizer is None:
+                tokenizer = AutoTokenizer.from_pretrained(model_id)
+                self._tokenizers[model_id] = tokenizer
+            return tokenizer
+
+    def get_model(self, model_id, device=None, dtype=None):
+        device = self.resolve_device(device)
+        dtype = dtype or self.dtype
+        key = (model_id, str(device), dtype)
+        with self._lock:
+            entry = self._models.get(key)
+            if entry is not None:
+                self._models.move_to_end(key)
+                return entry[0]
+            model = self._load(model_id, device, dtype)
+            self._models[key] = (model, model_bytes(model))
+            self.loads += 1
+            self._evict(keep=key)
+            return model
+
+    def _load(self, model_id, device, dtype):
+        logger.info(f"Loading BERT {model_id} on {device} ({dtype})")
+        model = BertFeatureExtractor.from_pretrained(model_id)
+        if dtype == 'int8':
+            if torch.device(device).type != 'cpu':
+                raise ValueError(f"int8 BERT only runs on the CPU, got device {device!r}")
+            return torch.ao.quantization.quantize_dynamic(model, {torch.nn.Linear}, dtype=torch.qint8)
+        if dtype == 'bf16':
+            model = model.to(dtype=torch.bfloat16)
+        return model.to(device)
+
+    def _evict(self, keep):
+        # Caller holds self._lock
+        while len(self._models) > 1:
+            over_count = self.max_models is not None and len(self._models) > self.max_models
+            over_bytes = self.max_bytes is not None and self.total_bytes() > self.max_bytes
+            if not (over_count or over_bytes):
+                break
+            key = next(k for k in self._models if k != keep)
+            self._models.pop(key)
+            self.evictions += 1
+            logger.info(f"Evicted BERT {key[0]} from {key[1]} ({key[2]})")
+            if torch.device(key[1]).type == 'cuda':
+                torch.cuda.empty_cache()
+
+    def total_bytes(self):
+        with self._lock:
+            return sum(nbytes for _, nbytes in self._models.values())
+
+    def unload(self, model_id=None):
+        """Drop loaded encoders, all of them or every copy of `model_id`"""
+        with self._lock:
+            for key in [k for k in self._models if model_id is None or k[0] == model_id]:
+                self._models.pop(key)
+
+    def warmup(self, languages, device=None):
+        """Load tokenizer and encoder for each language and run one forward pass"""
+        for language in languages:
+            model_id = LANGUAGE_MODELS[language]
+            tokenizer = self.get_tokenizer(model_id)
+            model = self.get_model(model_id, device)
+            inputs = tokenizer(["warm up"], return_tensors="pt")
+            with torch.no_grad():
+                model(**{k: v.to(self.resolve_device(device)) for k, v in inputs.items()})
+
+    def stats(self):
+        with self._lock:
+            return {
+                'device': self.device,
+                'dtype': self.dtype,
+                'max_models': self.max_models,
+                'max_bytes': self.max_bytes,
+                'bytes': self.total_bytes(),
+                'loads': self.loads,
+                'evictions': self.evictions,
+                'tokenizers': sorted(self._tokenizers),
+                'models': [
+                    {'model_id': model_id, 'device': device, 'dtype': dtype, 'bytes': nbytes}
+                    for (model_id, device, dtype), (_, nbytes) in self._models.items()
+                ],
+            }
+
+
+registry = BertRegistry()
+
+configure = registry.configure
+resolve_device = registry.resolve_device
+get_tokenizer = registry.get_tokenizer
+get_model = registry.get_model
+warmup = registry.warmup
+stats = registry.stats
@@ -1,11 +1,16 @@
 import os
 import re
+from functools import lru_cache
 
 import cn2an
-from pypinyin import lazy_pinyin, Style
+from pypinyin import Style
+from pypinyin.contrib.neutral_tone import NeutralToneWith5Mixin
+from pypinyin.converter import DefaultConverter
+from pypinyin.core import Pinyin
 
 from .symbols import punctuation
 from .tone_sandhi import ToneSandhi
+from .frontend_utils import compile_replacements
 
 current_file_path = os.path.dirname(__file__)
 pinyin_to_symbol_map = {
@@ -51,23 +56,21 @@ rep_map = {
 
 tone_modifier = ToneSandhi()
 
+_replace_rep_map = compile_replacements({"嗯": "恩", "呣": "母", **rep_map})
+_non_chinese_re = re.compile(r"[^\u4e00-\u9fa5" + "".join(punctuation) + r"]+")
+_sentence_split_re = re.compile(r"(?<=[{0}])\s*".format("".join(punctuation)))
+_english_re = re.compile("[a-zA-Z]+")
 
-def replace_punctuation(text):
-    text = text.replace("嗯", "恩").replace("呣", "母")
-    pattern = re.compile("|".join(re.escape(p) for p in rep_map.keys()))
-
-    replaced_text = pattern.sub(lambda x: rep_map[x.group()], text)
 
-    replaced_text = re.sub(
-        r"[^\u4e00-\u9fa5" + "".join(punctuation) + r"]+", "", replaced_text
-    )
+def replace_punctuation(text):
+    replaced_text = _replace_rep_map(text)
+    replaced_text = _non_chinese_re.sub("", replaced_text)
 
     return replaced_text
 
 
 def g2p(text):
-    pattern = r"(?<=[{0}])\s*".format("".join(punctuation))
-    sentences = [i for i in re.split(pattern, text) if i.strip() != ""]
+    sentences = [i for i in _sentence_split_re.split(text) if i.strip() != ""]
     phones, tones, word2ph = _g2p(sentences)
     assert sum(word2ph) == len(phones)
     assert len(word2ph) == len(text)  # Sometimes it will crash,you can add a try-catch.
@@ -77,94 +80,142 @@ def g2p(text):
     return phones, tones, word2ph
 
 
+class _InitialsFinalsConverter(NeutralToneWith5Mixin, DefaultConverter):
+    """Converts every pinyin to its (initial, tone3 final) pair in one lookup"""
+
+    def convert_style(self, han, orig_pinyin, style, strict, **kwargs):
+        convert = super().convert_style
+        return (
+            convert(han, orig_pinyin, Style.INITIALS, strict, **kwargs),
+            convert(han, orig_pinyin, Style.FINALS_TONE3, strict, **kwargs),
+        )
+
+
+_initials_finals_pinyin = Pinyin(_InitialsFinalsConverter())
+
+
 def _get_initials_finals(word):
     initials = []
     finals = []
-    orig_initials = lazy_pinyin(word, neutral_tone_with_five=True, style=Style.INITIALS)
-    orig_finals = lazy_pinyin(
-        word, neutral_tone_with_five=True, style=Style.FINALS_TONE3
-    )
-    for c, v in zip(orig_initials, orig_finals):
+    for item in _initials_finals_pinyin.lazy_pinyin(word, style=Style.FINALS_TONE3):
+        # Characters without pinyin, i.e. punctuation, are returned as they are
+        c, v = item if isinstance(item, tuple) else (item, item)
         initials.append(c)
         finals.append(v)
     return initials, finals
 
 
-def _g2p(segments):
-    phones_list = []
-    tones_list = []
+# 多音节
+v_rep_map = {
+    "uei": "ui",
+    "iou": "iu",
+    "uen": "un",
+}
+# 单音节
+pinyin_rep_map = {
+    "ing": "ying",
+    "i": "yi",
+    "in": "yin",
+    "u": "wu",
+}
+single_rep_map = {
+    "v": "yu",
+    "e": "e",
+    "i": "y",
+    "u": "w",
+}
+
+
+def _pinyin_to_phones(c, v, word):
+    raw_pinyin = c + v
+    # NOTE: post process for pypinyin outputs
+    # we discriminate i, ii and iii
+    if c == v:
+        assert c in punctuation
+        return [c], "0"
+    v_without_tone = v[:-1]
+    tone = v[-1]
+
+    pinyin = c + v_without_tone
+    assert tone in "12345"
+
+    if c:
+        if v_without_tone in v_rep_map:
+            pinyin = c + v_rep_map[v_without_tone]
+    else:
+        if pinyin in pinyin_rep_map:
+            pinyin = pinyin_rep_map[pinyin]
+        elif pinyin[0] in single_rep_map:
+            pinyin = single_rep_map[pinyin[0]] + pinyin[1:]
+
+    assert pinyin in pinyin_to_symbol_map, (pinyin, word, raw_pinyin)
+    return pinyin_to_symbol_map[pinyin].split(" "), tone
+
+
+WORD_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def _word_g2p(word, pos):
+    """Phones, tones and phones per character of a segmented word, tone sandhi applied"""
+    initials, finals = _get_initials_finals(word)
+    finals = tone_modifier.modified_tone(word, pos, finals)
+    phones = []
+    tones = []
     word2ph = []
-    for seg in segments:
-        # Replace all English words in the sentence
-        seg = re.sub("[a-zA-Z]+", "", seg)
-        seg_cut = psg.lcut(seg)
-        initials = []
-        finals = []
+    for c, v in zip(initials, finals):
+        phone, tone = _pinyin_to_phones(c, v, word)
+        phones += phone
+        tones += [int(tone)] * len(phone)
+        word2ph.append(len(phone))
+    return tuple(phones), tuple(tones), tuple(word2ph)
+
+
+def _cut_segments(segments):
+    # jieba cuts every run of Chinese characters on its own and a newline ends
+    # a run, so the segments joined by newlines cut in one call give the same
+    # words as cutting them one at a time
+    if len(segments) < 2 or any("\n" in seg or "\r" in seg for seg in segments):
+        return [psg.lcut(seg) for seg in segments]
+    seg_cuts = [[]]
+    for word, pos in psg.lcut("\n".join(segments)):
+        if word == "\n":
+            seg_cuts.append([])
+        else:
+            seg_cuts[-1].append((word, pos))
+    return seg_cuts
+
+
+def _g2p_segments(segments):
+    """Phones, tones and word2ph of every segment"""
+    # Replace all English words in the sentence
+    segments = [_english_re.sub("", seg) for seg in segments]
+    results = []
+    for seg_cut in _cut_segments(segments):
+        phones_list = []
+        tones_list = []
+        word2ph = []
         seg_cut = tone_modifier.pre_merge_for_modify(seg_cut)
         for word, pos in seg_cut:
             if pos == "eng":
                 import pdb; pdb.set_trace()
                 continue
-            sub_initials, sub_finals = _get_initials_finals(word)
-            sub_finals = tone_modifier.modified_tone(word, pos, sub_finals)
-            initials.append(sub_initials)
-            finals.append(sub_finals)
-
-            # assert len(sub_initials) == len(sub_finals) == len(word)
-        initials = sum(initials, [])
-        finals = sum(finals, [])
-        #
-        for c, v in zip(initials, finals):
-            raw_pinyin = c + v
-            # NOTE: post process for pypinyin outputs
-            # we discriminate i, ii and iii
-            if c == v:
-                assert c in punctuation
-                phone = [c]
-                tone = "0"
-                word2ph.append(1)
-            else:
-                v_without_tone = v[:-1]
-                tone = v[-1]
-
-                pinyin = c + v_without_tone
-                assert tone in "12345"
-
-                if c:
-                    # 多音节
-                    v_rep_map = {
-                        "uei": "ui",
-                        "iou": "iu",
-                        "uen": "un",
-                    }
-                    if v_without_tone in v_rep_map.keys():
-                        pinyin = c + v_rep_map[v_without_tone]
-                else:
-                    # 单音节
-                    pinyin_rep_map = {
-                        "ing": "ying",
-                        "i": "yi",
-                        "in": "yin",
-                        "u": "wu",
-                    }
-                    if pinyin in pinyin_rep_map.keys():
-                        pinyin = pinyin_rep_map[pinyin]
-                    else:
-                        single_rep_map = {
-                            "v": "yu",
-                            "e": "e",
-                            "i": "y",
-                            "u": "w",
-                        }
-                        if pinyin[0] in single_rep_map.keys():
-                            pinyin = single_rep_map[pinyin[0]] + pinyin[1:]
-
-                assert pinyin in pinyin_to_symbol_map.keys(), (pinyin, seg, raw_pinyin)
-                phone = pinyin_to_symbol_map[pinyin].split(" ")
-                word2ph.append(len(phone))
-
-            phones_list += phone
-            tones_list += [int(tone)] * len(phone)
+            phones, tones, word_word2ph = _word_g2p(word, pos)
+            phones_list += phones
+            tones_list += tones
+            word2ph += word_word2ph
+        results.append((phones_list, tones_list, word2ph))
+    return results
+
+
+def _g2p(segments):
+    phones_list = []
+    tones_list = []
+    word2ph = []
+    for phones, tones, seg_word2ph in _g2p_segments(segments):
+        phones_list += phones
+        tones_list += tones
+        word2ph += seg_word2ph
     return phones_list, tones_list, word2ph
 
 
@@ -2,13 +2,14 @@ import os
 import re
 
 import cn2an
-from pypinyin import lazy_pinyin, Style
 
 # from text.symbols import punctuation
+from . import bert_models
 from .symbols import language_tone_start_map
 from .tone_sandhi import ToneSandhi
+from .frontend_utils import compile_replacements
 from .english import g2p as g2p_en
-from transformers import AutoTokenizer
+from .chinese import _get_initials_finals
 
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
 current_file_path = os.path.dirname(__file__)
@@ -55,20 +56,22 @@ rep_map = {
 
 tone_modifier = ToneSandhi()
 
+_replace_rep_map = compile_replacements({"嗯": "恩", "呣": "母", **rep_map})
+_unsupported_re = re.compile(r"[^\u4e00-\u9fa5_a-zA-Z\s" + "".join(punctuation) + r"]+")
+_whitespace_re = re.compile(r"[\s]+")
+_sentence_split_re = re.compile(r"(?<=[{0}])\s*".format("".join(punctuation)))
+
 
 def replace_punctuation(text):
-    text = text.replace("嗯", "恩").replace("呣", "母")
-    pattern = re.compile("|".join(re.escape(p) for p in rep_map.keys()))
-    replaced_text = pattern.sub(lambda x: rep_map[x.group()], text)
-    replaced_text = re.sub(r"[^\u4e00-\u9fa5_a-zA-Z\s" + "".join(punctuation) + r"]+", "", replaced_text)
-    replaced_text = re.sub(r"[\s]+", " ", replaced_text)
+    replaced_text = _replace_rep_map(text)
+    replaced_text = _unsupported_re.sub("", replaced_text)
+    replaced_text = _whitespace_re.sub(" ", replaced_text)
 
     return replaced_text
 
 
 def g2p(text, impl='v2'):
-    pattern = r"(?<=[{0}])\s*".format("".join(punctuation))
-    sentences = [i for i in re.split(pattern, text) if i.strip() != ""]
+    sentences = [i for i in _sentence_split_re.split(text) if i.strip() != ""]
     if impl == 'v1':
         _func = _g2p
     elif impl == 'v2':
@@ -84,20 +87,7 @@ def g2p(text, impl='v2'):
     return phones, tones, word2ph
 
 
-def _get_initials_finals(word):
-    initials = []
-    finals = []
-    orig_initials = lazy_pinyin(word, neutral_tone_with_five=True, style=Style.INITIALS)
-    orig_finals = lazy_pinyin(
-        word, neutral_tone_with_five=True, style=Style.FINALS_TONE3
-    )
-    for c, v in zip(orig_initials, orig_finals):
-        initials.append(c)
-        finals.append(v)
-    return initials, finals
-
-model_id = 'bert-base-multilingual-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+model_id = bert_models.LANGUAGE_MODELS['ZH_MIX_EN']
 def _g2p(segments):
     phones_list = []
     tones_list = []
@@ -111,21 +101,19 @@ def _g2p(segments):
         seg_cut = tone_modifier.pre_merge_for_modify(seg_cut)
         for word, pos in seg_cut:
             if pos == "eng":
-                initials.append(['EN_WORD'])
-                finals.append([word])
+                initials.append('EN_WORD')
+                finals.append(word)
             else:
                 sub_initials, sub_finals = _get_initials_finals(word)
                 sub_finals = tone_modifier.modified_tone(word, pos, sub_finals)
-                initials.append(sub_initials)
-                finals.append(sub_finals)
+                initials += sub_initials
+                finals += sub_finals
 
             # assert len(sub_initials) == len(sub_finals) == len(word)
-        initials = sum(initials, [])
-        finals = sum(finals, [])
         #
         for c, v in zip(initials, finals):
             if c == 'EN_WORD':
-                tokenized_en = tokenizer.tokenize(v)
+                tokenized_en = bert_models.get_tokenizer(model_id).tokenize(v)
                 phones_en, tones_en, word2ph_en = g2p_en(text=None, pad_start_end=False, tokenized=tokenized_en)
                 # apply offset to tones_en
                 tones_en = [t + language_tone_start_map['EN'] for t in tones_en]
@@ -196,9 +184,13 @@ def text_normalize(text):
 
 def get_bert_feature(text, word2ph, device):
     from . import chinese_bert
-    return chinese_bert.get_bert_feature(text, word2ph, model_id='bert-base-multilingual-uncased', device=device)
+    return chinese_bert.get_bert_feature(text, word2ph, model_id=model_id, device=device)
+
+def get_bert_feature_batch(texts, word2phs, device):
+    from . import chinese_bert
+    return chinese_bert.get_bert_feature_batch(texts, word2phs, model_id=model_id, device=device)
 
-from .chinese import _g2p as _chinese_g2p
+from .chinese import _g2p_segments as _chinese_g2p_segments
 def _g2p_v2(segments):
     spliter = '#$&^!@'
 
@@ -206,29 +198,31 @@ def _g2p_v2(segments):
     tones_list = []
     word2ph = []
 
+    texts = []
     for text in segments:
         assert spliter not in text
         # replace all english words
         text = re.sub('([a-zA-Z\s]+)', lambda x: f'{spliter}{x.group(1)}{spliter}', text)
-        texts = text.split(spliter)
-        texts = [t for t in texts if len(t) > 0]
-
-        
-        for text in texts:
-            if re.match('[a-zA-Z\s]+', text):
-                # english
-                tokenized_en = tokenizer.tokenize(text)
-                phones_en, tones_en, word2ph_en = g2p_en(text=None, pad_start_end=False, tokenized=tokenized_en)
-                # apply offset to tones_en
-                tones_en = [t + language_tone_start_map['EN'] for t in tones_en]
-                phones_list += phones_en
-                tones_list += tones_en
-                word2ph += word2ph_en
-            else:
-                phones_zh, tones_zh, word2ph_zh = _chinese_g2p([text])
-                phones_list += phones_zh
-                tones_list += tones_zh
-                word2ph += word2ph_zh
+        texts += [t for t in text.split(spliter) if len(t) > 0]
+
+    is_english = [bool(re.match('[a-zA-Z\s]+', text)) for text in texts]
+    # All Chinese parts of the document go through the Chinese frontend at once
+    results_zh = iter(_chinese_g2p_segments([t for t, en in zip(texts, is_english) if not en]))
+    for text, en in zip(texts, is_english):
+        if en:
+            # english
+            tokenized_en = bert_models.get_tokenizer(model_id).tokenize(text)
+            phones_en, tones_en, word2ph_en = g2p_en(text=None, pad_start_end=False, tokenized=tokenized_en)
+            # apply offset to tones_en
+            tones_en = [t + language_tone_start_map['EN'] for t in tones_en]
+            phones_list += phones_en
+            tones_list += tones_en
+            word2ph += word2ph_en
+        else:
+            phones_zh, tones_zh, word2ph_zh = next(results_zh)
+            phones_list += phones_zh
+            tones_list += tones_zh
+            word2ph += word2ph_zh
     return phones_list, tones_list, word2ph
 
     
@@ -1,22 +1,41 @@
-from . import chinese, japanese, english, chinese_mix, korean, french, spanish
-from . import cleaned_text_to_sequence
+from . import cleaned_text_to_sequence, get_bert_batch, get_frontend
+from functools import lru_cache
 import copy
 
-language_module_map = {"ZH": chinese, "JP": japanese, "EN": english, 'ZH_MIX_EN': chinese_mix, 'KR': korean,
-                    'FR': french, 'SP': spanish, 'ES': spanish}
+# Normalized sentences whose g2p output is kept, shared by all callers in the process
+G2P_CACHE_SIZE = 4096
+
+
+@lru_cache(maxsize=G2P_CACHE_SIZE)
+def _cached_g2p(language, norm_text):
+    phones, tones, word2ph = get_frontend(language).g2p(norm_text)
+    return tuple(phones), tuple(tones), tuple(word2ph)
+
+
+def g2p(norm_text, language):
+    """g2p of a normalized sentence, repeated sentences are answered from a cache.
+
+    Returns fresh lists, callers are free to modify them.
+    """
+    phones, tones, word2ph = _cached_g2p(language, norm_text)
+    return list(phones), list(tones), list(word2ph)
+
+
+clear_g2p_cache = _cached_g2p.cache_clear
+g2p_cache_info = _cached_g2p.cache_info
 
 
 def clean_text(text, language):
-    language_module = language_module_map[language]
+    language_module = get_frontend(language)
     norm_text = language_module.text_normalize(text)
-    phones, tones, word2ph = language_module.g2p(norm_text)
+    phones, tones, word2ph = g2p(norm_text, language)
     return norm_text, phones, tones, word2ph
 
 
 def clean_text_bert(text, language, device=None):
-    language_module = language_module_map[language]
+    language_module = get_frontend(language)
     norm_text = language_module.text_normalize(text)
-    phones, tones, word2ph = language_module.g2p(norm_text)
+    phones, tones, word2ph = g2p(norm_text, language)
     
     word2ph_bak = copy.deepcopy(word2ph)
     for i in range(len(word2ph)):
@@ -27,6 +46,25 @@ def clean_text_bert(text, language, device=None):
     return norm_text, phones, tones, word2ph_bak, bert
 
 
+def clean_text_bert_batch(texts, language, device=None):
+    language_module = get_frontend(language)
+    cleaned = []
+    word2phs = []
+    for text in texts:
+        norm_text = language_module.text_normalize(text)
+        phones, tones, word2ph = g2p(norm_text, language)
+
+        word2ph_bak = copy.deepcopy(word2ph)
+        for i in range(len(word2ph)):
+            word2ph[i] = word2ph[i] * 2
+        word2ph[0] += 1
+        cleaned.append((norm_text, phones, tones, word2ph_bak))
+        word2phs.append(word2ph)
+    berts = get_bert_batch([c[0] for c in cleaned], word2phs, language, device)
+
+    return [c + (bert,) for c, bert in zip(cleaned, berts)]
+
+
 def text_to_sequence(text, language):
     norm_text, phones, tones, word2ph = clean_text(text, language)
     return cleaned_text_to_sequence(phones, tones, language)
@@ -0,0 +1,155 @@
+"""Read-only CMU pronouncing dictionary in a compact, memory-mappable file.
+
+The file holds the words sorted by their UTF-8 bytes, and for every word its
+phones (stress removed, as ids into a small phone inventory) and tones (stress
++ 1, 0 for unstressed phones) in flat uint8 arrays. Lookups bisect the sorted
+keys, so nothing is unpacked at load time and processes that map the same file
+share its pages.
+"""
+import bisect
+import mmap
+import os
+import struct
+import sys
+import tempfile
+from array import array
+
+MAGIC = b"CMUDICT" + (b"L" if sys.byteorder == "little" else b"B")
+# magic, number of words, number of phones, bytes of phone inventory, bytes of keys
+HEADER = struct.Struct("=8sIIII")
+
+
+def _pad(n):
+    return -n % 4
+
+
+def compile_dict(g2p_dict, refine):
+    """Pack {WORD: syllables} into the store format.
+
+    `refine(syllables)` turns the syllables of one word into (phones, tones).
+    """
+    words = sorted(g2p_dict, key=lambda w: w.encode("utf-8"))
+    symbol_ids = {}
+    key_offsets = array("I", [0])
+    entry_offsets = array("I", [0])
+    phones = array("B")
+    tones = array("B")
+    keys = bytearray()
+    for word in words:
+        keys += word.encode("utf-8")
+        key_offsets.append(len(keys))
+        word_phones, word_tones = refine(g2p_dict[word])
+        for ph, tn in zip(word_phones, word_tones):
+            phones.append(symbol_ids.setdefault(ph, len(symbol_ids)))
+            tones.append(tn)
+        entry_offsets.append(len(phones))
+    symbols = "\n".join(symbol_ids).encode("utf-8")
+
+    out = bytearray(HEADER.pack(MAGIC, len(words), len(phones), len(symbols), len(keys)))
+    for section in (key_offsets.tobytes(), entry_offsets.tobytes(), phones.tobytes(), tones.tobytes(), symbols, keys):
+        out += section
+        out += b"\0" * _pad(len(section))
+    return bytes(out)
+
+
+def write_dict(data, path):
+    # Write to a temp file first so other processes never map a partial store
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        # mkstemp creates the file private, the store is shared with other users' workers
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+
+
+class _Keys:
+    """Sequence view of the sorted keys, for bisect"""
+
+    def __init__(self, offsets, blob):
+        self.offsets = offsets
+        self.blob = blob
+
+    def __len__(self):
+        return len(self.offsets) - 1
+
+    def __getitem__(self, i):
+        return bytes(self.blob[self.offsets[i]:self.offsets[i + 1]])
+
+
+class CMUDictStore:
+    """Mapping of upper-case word -> (phones, tones) backed by a compiled store"""
+
+    def __init__(self, buffer):
+        self._buffer = buffer
+        view = memoryview(buffer)
+        magic, n_words, n_phones, symbols_len, keys_len = HEADER.unpack_from(view)
+        if magic != MAGIC:
+            raise ValueError("Not a CMU dict store for this platform")
+        sections = []
+        offset = HEADER.size
+        for nbytes in (4 * (n_words + 1), 4 * (n_words + 1), n_phones, n_phones, symbols_len, keys_len):
+            sections.append(view[offset:offset + nbytes])
+            offset += nbytes + _pad(nbytes)
+        key_offsets, entry_offsets, self._phones, self._tones, symbols, keys = sections
+        self._entry_offsets = entry_offsets.cast("I")
+        self._symbols = bytes(symbols).decode("utf-8").split("\n")
+        self._keys = _Keys(key_offsets.cast("I"), keys)
+
+    @classmethod
+    def open(cls, path):
+        with open(path, "rb") as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def _index(self, word):
+        key = word.encode("utf-8")
+        i = bisect.bisect_left(self._keys, key)
+        if i < len(self._keys) and self._keys[i] == key:
+            return i
+        return -1
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, word):
+        return self._index(word) >= 0
+
+    def __getitem__(self, word):
+        i = self._index(word)
+        if i < 0:
+            raise KeyError(word)
+        start, end = self._entry_offsets[i], self._entry_offsets[i + 1]
+        return [self._symbols[p] for p in self._phones[start:end]], list(self._tones[start:end])
+
+    def get(self, word, default=None):
+        try:
+            return self[word]
+        except KeyError:
+            return default
+
+    def __iter__(self):
+        for i in range(len(self._keys)):
+            yield self._keys[i].decode("utf-8")
+
+
+def load_dict(store_path, source_path, read_source, refine):
+    """Open the store at `store_path`, (re)building it from `source_path` when missing or stale.
+
+    When the store cannot be written (e.g. a read-only install) the compiled
+    bytes are used from memory instead.
+    """
+    try:
+        if os.path.getmtime(store_path) >= os.path.getmtime(source_path):
+            return CMUDictStore.open(store_path)
+    except (OSError, ValueError, struct.error):
+        pass
+    data = compile_dict(read_source(), refine)
+    try:
+        write_dict(data, store_path)
+    except OSError:
+        return CMUDictStore(data)
+    return CMUDictStore.open(store_path)
@@ -1,21 +1,24 @@
-import pickle
 import os
 import re
+from functools import lru_cache
 from g2p_en import G2p
 
 from . import symbols
+from . import bert_models
+from .cmudict_store import load_dict
 
 from .english_utils.abbreviations import expand_abbreviations
 from .english_utils.time_norm import expand_time_english
 from .english_utils.number_norm import normalize_numbers
-from .japanese import distribute_phone
+from .frontend_utils import distribute_phone
 
-from transformers import AutoTokenizer
 
 current_file_path = os.path.dirname(__file__)
 CMU_DICT_PATH = os.path.join(current_file_path, "cmudict.rep")
-CACHE_PATH = os.path.join(current_file_path, "cmudict_cache.pickle")
+STORE_PATH = os.path.join(current_file_path, "cmudict_store.bin")
 _g2p = G2p()
+# Words missing from the CMU dict whose g2p_en prediction is kept around
+OOV_CACHE_SIZE = 8192
 
 arpa = {
     "AH0",
@@ -139,25 +142,6 @@ def read_dict():
     return g2p_dict
 
 
-def cache_dict(g2p_dict, file_path):
-    with open(file_path, "wb") as pickle_file:
-        pickle.dump(g2p_dict, pickle_file)
-
-
-def get_dict():
-    if os.path.exists(CACHE_PATH):
-        with open(CACHE_PATH, "rb") as pickle_file:
-            g2p_dict = pickle.load(pickle_file)
-    else:
-        g2p_dict = read_dict()
-        cache_dict(g2p_dict, CACHE_PATH)
-
-    return g2p_dict
-
-
-eng_dict = get_dict()
-
-
 def refine_ph(phn):
     tone = 0
     if re.search(r"\d$", phn):
@@ -178,6 +162,28 @@ def refine_syllables(syllables):
     return phonemes, tones
 
 
+@lru_cache(maxsize=OOV_CACHE_SIZE)
+def oov_pronunciation(word):
+    """Phones and tones g2p_en predicts for a word that is not in the CMU dict"""
+    phones = []
+    tones = []
+    for ph in _g2p(word):
+        if ph == " ":
+            continue
+        if ph in arpa:
+            ph, tn = refine_ph(ph)
+            phones.append(ph)
+            tones.append(tn)
+        else:
+            phones.append(ph)
+            tones.append(0)
+    return tuple(phones), tuple(tones)
+
+
+# Upper-case word -> (phones, tones), already refined with refine_syllables
+eng_dict = load_dict(STORE_PATH, CMU_DICT_PATH, read_dict, refine_syllables)
+
+
 def text_normalize(text):
     text = text.lower()
     text = expand_time_english(text)
@@ -185,29 +191,23 @@ def text_normalize(text):
     text = expand_abbreviations(text)
     return text
 
-model_id = 'bert-base-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+model_id = bert_models.LANGUAGE_MODELS['EN']
 def g2p_old(text):
-    tokenized = tokenizer.tokenize(text)
+    tokenized = bert_models.get_tokenizer(model_id).tokenize(text)
     # import pdb; pdb.set_trace()
     phones = []
     tones = []
     words = re.split(r"([,;.\-\?\!\s+])", text)
     for w in words:
-        if w.upper() in eng_dict:
-            phns, tns = refine_syllables(eng_dict[w.upper()])
+        pron = eng_dict.get(w.upper())
+        if pron is not None:
+            phns, tns = pron
             phones += phns
             tones += tns
         else:
-            phone_list = list(filter(lambda p: p != " ", _g2p(w)))
-            for ph in phone_list:
-                if ph in arpa:
-                    ph, tn = refine_ph(ph)
-                    phones.append(ph)
-                    tones.append(tn)
-                else:
-                    phones.append(ph)
-                    tones.append(0)
+            phns, tns = oov_pronunciation(w)
+            phones += phns
+            tones += tns
     # todo: implement word2ph
     word2ph = [1 for i in phones]
 
@@ -216,7 +216,7 @@ def g2p_old(text):
 
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
-        tokenized = tokenizer.tokenize(text)
+        tokenized = bert_models.get_tokenizer(model_id).tokenize(text)
     # import pdb; pdb.set_trace()
     phs = []
     ph_groups = []
@@ -233,22 +233,17 @@ def g2p(text, pad_start_end=True, tokenized=None):
         w = "".join(group)
         phone_len = 0
         word_len = len(group)
-        if w.upper() in eng_dict:
-            phns, tns = refine_syllables(eng_dict[w.upper()])
+        pron = eng_dict.get(w.upper())
+        if pron is not None:
+            phns, tns = pron
             phones += phns
             tones += tns
             phone_len += len(phns)
         else:
-            phone_list = list(filter(lambda p: p != " ", _g2p(w)))
-            for ph in phone_list:
-                if ph in arpa:
-                    ph, tn = refine_ph(ph)
-                    phones.append(ph)
-                    tones.append(tn)
-                else:
-                    phones.append(ph)
-                    tones.append(0)
-                phone_len += 1
+            phns, tns = oov_pronunciation(w)
+            phones += phns
+            tones += tns
+            phone_len += len(phns)
         aaa = distribute_phone(phone_len, word_len)
         word2ph += aaa
     phones = [post_replace_ph(i) for i in phones]
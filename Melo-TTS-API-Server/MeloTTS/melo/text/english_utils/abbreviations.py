@@ -1,5 +1,7 @@
 import re
 
+from ..frontend_utils import compile_rules
+
 # List of (regular expression, replacement) pairs for abbreviations in english:
 abbreviations_en = [
     (re.compile("\\b%s\\." % x[0], re.IGNORECASE), x[1])
@@ -25,11 +27,11 @@ abbreviations_en = [
     ]
 ]
 
+# All abbreviations of a language expanded in one pass over the text
+_abbreviation_expanders = {"en": compile_rules(abbreviations_en)}
+
+
 def expand_abbreviations(text, lang="en"):
-    if lang == "en":
-        _abbreviations = abbreviations_en
-    else:
+    if lang not in _abbreviation_expanders:
         raise NotImplementedError()
-    for regex, replacement in _abbreviations:
-        text = re.sub(regex, replacement, text)
-    return text
\ No newline at end of file
+    return _abbreviation_expanders[lang](text)
\ No newline at end of file
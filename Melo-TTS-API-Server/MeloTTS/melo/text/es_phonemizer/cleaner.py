@@ -2,6 +2,7 @@
 # TODO: pick the cleaner for languages dynamically
 
 import re
+from ..frontend_utils import compile_replacements
 
 # Regular expression matching whitespace:
 _whitespace_re = re.compile(r"\s+")
@@ -40,10 +41,11 @@ rep_map = {
     "」": "'",
 }
 
+_replace_rep_map = compile_replacements(rep_map)
+
+
 def replace_punctuation(text):
-    pattern = re.compile("|".join(re.escape(p) for p in rep_map.keys()))
-    replaced_text = pattern.sub(lambda x: rep_map[x.group()], text)
-    return replaced_text
+    return _replace_rep_map(text)
 
 def lowercase(text):
     return text.lower()
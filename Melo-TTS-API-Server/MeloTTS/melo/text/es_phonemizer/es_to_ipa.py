@@ -1,12 +1,40 @@
+import threading
+
 from .cleaner import spanish_cleaners
 from .gruut_wrapper import Gruut
+from ..frontend_utils import LRUCache
+
+# IPA of single words, shared by all sentences
+WORD_CACHE_SIZE = 16384
+_word_cache = LRUCache(WORD_CACHE_SIZE)
+_phonemizer = None
+_phonemizer_lock = threading.Lock()
+
+def get_phonemizer():
+    global _phonemizer
+    with _phonemizer_lock:
+        if _phonemizer is None:
+            _phonemizer = Gruut(language="es-es", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
+        return _phonemizer
 
 def es2ipa(text):
-    e = Gruut(language="es-es", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
+    e = get_phonemizer()
     # text = spanish_cleaners(text)
     phonemes = e.phonemize(text, separator="")
     return phonemes
 
+def es2ipa_words(words):
+    """es2ipa of each word on its own; words not seen before share one gruut pass"""
+    ipas = [_word_cache.get(w) for w in words]
+    missing = list(dict.fromkeys(w for w, ipa in zip(words, ipas) if ipa is None))
+    if missing:
+        phonemized = get_phonemizer().phonemize_words(missing, separator="")
+        new = dict(zip(missing, phonemized))
+        for w, phonemes in new.items():
+            _word_cache.put(w, phonemes)
+        ipas = [new[w] if ipa is None else ipa for w, ipa in zip(words, ipas)]
+    return ipas
+
 
 if __name__ == '__main__':
-  print(es2ipa('¿Y a quién echaría de menos, en el mundo si no fuese a vos?'))
\ No newline at end of file
+  print(es2ipa('¿Y a quién echaría de menos, en el mundo si no fuese a vos?'))
@@ -2,6 +2,7 @@
 # TODO: pick the cleaner for languages dynamically
 
 import re
+from ..frontend_utils import compile_replacements, compile_rules
 from .french_abbreviations import abbreviations_fr
 
 # Regular expression matching whitespace:
@@ -45,17 +46,20 @@ rep_map = {
 }
 
 
+_replace_rep_map = compile_replacements(rep_map)
+
+
 def replace_punctuation(text):
-    pattern = re.compile("|".join(re.escape(p) for p in rep_map.keys()))
-    replaced_text = pattern.sub(lambda x: rep_map[x.group()], text)
-    return replaced_text
+    return _replace_rep_map(text)
+
+# All abbreviations of a language expanded in one pass over the text
+_abbreviation_expanders = {"fr": compile_rules(abbreviations_fr)}
+
 
 def expand_abbreviations(text, lang="fr"):
-    if lang == "fr":
-        _abbreviations = abbreviations_fr
-    for regex, replacement in _abbreviations:
-        text = re.sub(regex, replacement, text)
-    return text
+    if lang not in _abbreviation_expanders:
+        raise NotImplementedError()
+    return _abbreviation_expanders[lang](text)
 
 
 def lowercase(text):
@@ -1,5 +1,14 @@
+import threading
+
 from .cleaner import french_cleaners
 from .gruut_wrapper import Gruut
+from ..frontend_utils import LRUCache
+
+# IPA of single words, shared by all sentences
+WORD_CACHE_SIZE = 16384
+_word_cache = LRUCache(WORD_CACHE_SIZE)
+_phonemizer = None
+_phonemizer_lock = threading.Lock()
 
 
 def remove_consecutive_t(input_str):
@@ -20,11 +29,31 @@ def remove_consecutive_t(input_str):
 
     return ''.join(result)
 
+def get_phonemizer():
+    global _phonemizer
+    with _phonemizer_lock:
+        if _phonemizer is None:
+            _phonemizer = Gruut(language="fr-fr", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
+        return _phonemizer
+
 def fr2ipa(text):
-    e = Gruut(language="fr-fr", keep_puncs=True, keep_stress=True, use_espeak_phonemes=True)
+    e = get_phonemizer()
     # text = french_cleaners(text)
     phonemes = e.phonemize(text, separator="")
     # print(phonemes)
     phonemes = remove_consecutive_t(phonemes)
     # print(phonemes)
-    return phonemes
\ No newline at end of file
+    return phonemes
+
+def fr2ipa_words(words):
+    """fr2ipa of each word on its own; words not seen before share one gruut pass"""
+    ipas = [_word_cache.get(w) for w in words]
+    missing = list(dict.fromkeys(w for w, ipa in zip(words, ipas) if ipa is None))
+    if missing:
+        phonemized = get_phonemizer().phonemize_words(missing, separator="")
+        new = {}
+        for w, phonemes in zip(missing, phonemized):
+            new[w] = remove_consecutive_t(phonemes)
+            _word_cache.put(w, new[w])
+        ipas = [new[w] if ipa is None else ipa for w, ipa in zip(words, ipas)]
+    return ipas
@@ -86,19 +86,7 @@ class Gruut(BasePhonemizer):
                         ph_list.append([word.text])
                 elif word.phonemes:
                     # Add phonemes for word
-                    word_phonemes = []
-
-                    for word_phoneme in word.phonemes:
-                        if not self.keep_stress:
-                            # Remove primary/secondary stress
-                            word_phoneme = IPA.without_stress(word_phoneme)
-
-                        word_phoneme = word_phoneme.translate(GRUUT_TRANS_TABLE)
-
-                        if word_phoneme:
-                            # Flatten phonemes
-                            word_phonemes.extend(word_phoneme)
-
+                    word_phonemes = self._word_phonemes(word)
                     if word_phonemes:
                         ph_list.append(word_phonemes)
 
@@ -106,6 +94,49 @@ class Gruut(BasePhonemizer):
         ph = f"{separator} ".join(ph_words)
         return ph
 
+    def _word_phonemes(self, word):
+        word_phonemes = []
+
+        for word_phoneme in word.phonemes:
+            if not self.keep_stress:
+                # Remove primary/secondary stress
+                word_phoneme = IPA.without_stress(word_phoneme)
+
+            word_phoneme = word_phoneme.translate(GRUUT_TRANS_TABLE)
+
+            if word_phoneme:
+                # Flatten phonemes
+                word_phonemes.extend(word_phoneme)
+
+        return word_phonemes
+
+    def phonemize_words(self, words, separator="|"):
+        """Phonemize each word on its own, as `phonemize(word)` would, in one gruut pass.
+
+        Purely alphabetic words are run through gruut together. Sentence
+        post-processing (French liaison) is turned off so no word is changed by
+        its neighbours. When gruut does not return exactly one word per input
+        word, and for all other words, this falls back to `phonemize(word)`.
+        """
+        batch = [w for w in words if w.isalpha()]
+        batched = {}
+        if batch:
+            texts = []
+            ph_list = []
+            for sentence in gruut.sentences(
+                " ".join(batch), lang=self.language, espeak=self.use_espeak_phonemes, post_process=False
+            ):
+                for word in sentence:
+                    if word.is_break or not word.phonemes:
+                        continue
+                    texts.append(word.text)
+                    ph_list.append(self._word_phonemes(word))
+            if len(texts) == len(batch) and all(
+                t.casefold() == w.casefold() and p for t, w, p in zip(texts, batch, ph_list)
+            ):
+                batched = {w: separator.join(p) for w, p in zip(batch, ph_list)}
+        return [batched[w] if w in batched else self.phonemize(w, separator=separator) for w in words]
+
     def _phonemize(self, text, separator):
         return self.phonemize_gruut(text, separator, tie=False)
 
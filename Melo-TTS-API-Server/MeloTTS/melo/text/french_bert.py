@@ -1,39 +1,27 @@
 import torch
-from transformers import AutoTokenizer, AutoModelForMaskedLM
-import sys
 
-model_id = 'dbmdz/bert-base-french-europeana-cased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
-model = None
+from . import bert_models
+from .bert_features import expand_to_phones
+
+model_id = bert_models.LANGUAGE_MODELS['FR']
 
 def get_bert_feature(text, word2ph, device=None):
-    global model
-    if (
-        sys.platform == "darwin"
-        and torch.backends.mps.is_available()
-        and device == "cpu"
-    ):
-        device = "mps"
-    if not device:
-        device = "cuda"
-    if model is None:
-        model = AutoModelForMaskedLM.from_pretrained(model_id).to(
-            device
-        )
+    return get_bert_feature_batch([text], [word2ph], device=device)[0]
+
+def get_bert_feature_batch(texts, word2phs, device=None):
+    device = bert_models.resolve_device(device)
+    tokenizer = bert_models.get_tokenizer(model_id)
+    model = bert_models.get_model(model_id, device)
     with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
+        inputs = tokenizer(texts, padding=True, return_tensors="pt")
         for i in inputs:
             inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
+        res = model(**inputs)
         
-    assert inputs["input_ids"].shape[-1] == len(word2ph)
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
-
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
+    lengths = inputs["attention_mask"].sum(-1).tolist()
+    features = []
+    for res_i, length, word2phone in zip(res, lengths, word2phs):
+        assert length == len(word2phone)
+        features.append(expand_to_phones(res_i, word2phone))
 
-    return phone_level_feature.T
+    return features
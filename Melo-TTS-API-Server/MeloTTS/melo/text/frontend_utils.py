@@ -0,0 +1,95 @@
+import re
+import threading
+from collections import OrderedDict
+
+
+def distribute_phone(n_phone, n_word):
+    """Split n_phone phones over the n_word BERT tokens of a word.
+
+    Every token gets n_phone // n_word phones and the first n_phone % n_word
+    tokens one more, the same split as handing the phones out one at a time to
+    the token with the fewest.
+    """
+    n_phone = max(n_phone, 0)
+    if n_word <= 0:
+        if n_phone:
+            raise ValueError(f"Cannot distribute {n_phone} phones over {n_word} words")
+        return []
+    quotient, remainder = divmod(n_phone, n_word)
+    return [quotient + 1] * remainder + [quotient] * (n_word - remainder)
+
+
+def compile_replacements(mapping):
+    """Return a function replacing every key of `mapping` in a text by its value.
+
+    All keys are matched by one precompiled alternation in a single pass; where
+    keys overlap the one listed first wins, as with `re.sub` on the joined keys.
+    """
+    if not mapping:
+        return lambda text: text
+    pattern = re.compile("|".join(re.escape(key) for key in mapping))
+    return lambda text: pattern.sub(lambda m: mapping[m.group()], text)
+
+
+_INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+
+
+def compile_rules(rules):
+    """Return a function applying [(regex, replacement)] rules in one pass.
+
+    The regexes (compiled or not, without groups of their own) are joined into
+    one alternation with a group per rule, keeping each rule's flags inline,
+    and the matching group picks the replacement. At every position the first
+    rule in the list wins, so for rules whose replacements don't create new
+    matches this is the same as applying them one after another with `re.sub`.
+    """
+    rules = [(getattr(regex, "pattern", regex), getattr(regex, "flags", 0), replacement) for regex, replacement in rules]
+    if not rules:
+        return lambda text: text
+    # Rules anchored on a word boundary only need to be tried there
+    anchor = r"\b" if all(pattern.startswith(r"\b") for pattern, _, _ in rules) else ""
+    parts = []
+    replacements = []
+    seen = set()
+    for pattern, flags, replacement in rules:
+        # A repeated rule never gets to match, the first copy always does
+        if (pattern, flags) in seen:
+            continue
+        seen.add((pattern, flags))
+        pattern = pattern[len(anchor):]
+        inline = "".join(c for flag, c in _INLINE_FLAGS if flags & flag)
+        parts.append(f"((?{inline}:{pattern}))" if inline else f"({pattern})")
+        replacements.append(replacement)
+    combined = re.compile(anchor + "(?:" + "|".join(parts) + ")")
+    return lambda text: combined.sub(lambda m: replacements[m.lastindex - 1], text)
+
+
+class LRUCache:
+    """Bounded, thread-safe mapping that drops the least recently used entries"""
+
+    def __init__(self, maxsize):
+        self.maxsize = maxsize
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            try:
+                self._entries.move_to_end(key)
+            except KeyError:
+                return default
+            return self._entries[key]
+
+    def put(self, key, value):
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
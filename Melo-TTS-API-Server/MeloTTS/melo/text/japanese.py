@@ -2,10 +2,12 @@
 # compatible with Julius https://github.com/julius-speech/segmentation-kit
 import re
 import unicodedata
+from functools import lru_cache
 
-from transformers import AutoTokenizer
 
 from . import symbols
+from . import bert_models
+from .frontend_utils import compile_replacements, distribute_phone
 punctuation = ["!", "?", "…", ",", ".", "'", "-"]
 
 try:
@@ -330,26 +332,50 @@ def _makerulemap():
 _RULEMAP1, _RULEMAP2 = _makerulemap()
 
 
-def kata2phoneme(text: str) -> str:
-    """Convert katakana text to phonemes."""
+def _makeruletrie():
+    # first letter -> (phonemes of the one letter rule or None, {second letter: phonemes})
+    trie = {}
+    for k, v in _RULEMAP1.items():
+        trie.setdefault(k, [None, {}])[0] = tuple(v.split(" ")[1:])
+    for k, v in _RULEMAP2.items():
+        trie.setdefault(k[0], [None, {}])[1][k[1]] = tuple(v.split(" ")[1:])
+    return {k: tuple(v) for k, v in trie.items()}
+
+
+_RULETRIE = _makeruletrie()
+
+KATA_CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=KATA_CACHE_SIZE)
+def _kata2phoneme(text: str) -> tuple:
+    # One left to right pass over the rule trie, two letter rules win over one letter rules
     text = text.strip()
     res = []
-    while text:
-        if len(text) >= 2:
-            x = _RULEMAP2.get(text[:2])
-            if x is not None:
-                text = text[2:]
-                res += x.split(" ")[1:]
+    i = 0
+    n = len(text)
+    while i < n:
+        ch = text[i]
+        node = _RULETRIE.get(ch)
+        if node is not None:
+            single, pairs = node
+            if i + 1 < n and text[i + 1] in pairs:
+                res += pairs[text[i + 1]]
+                i += 2
                 continue
-        x = _RULEMAP1.get(text[0])
-        if x is not None:
-            text = text[1:]
-            res += x.split(" ")[1:]
-            continue
-        res.append(text[0])
-        text = text[1:]
+            if single is not None:
+                res += single
+                i += 1
+                continue
+        res.append(ch)
+        i += 1
     # res = _COLON_RX.sub(":", res)
-    return res
+    return tuple(res)
+
+
+def kata2phoneme(text: str) -> str:
+    """Convert katakana text to phonemes."""
+    return list(_kata2phoneme(text))
 
 
 _KATAKANA = "".join(chr(ch) for ch in range(ord("ァ"), ord("ン") + 1))
@@ -521,18 +547,17 @@ rep_map = {
 }
 
 
-def replace_punctuation(text):
-    pattern = re.compile("|".join(re.escape(p) for p in rep_map.keys()))
+_replace_rep_map = compile_replacements(rep_map)
+_non_japanese_re = re.compile(
+    r"[^\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FFF\u3400-\u4DBF"
+    + "".join(punctuation)
+    + r"]+"
+)
 
-    replaced_text = pattern.sub(lambda x: rep_map[x.group()], text)
 
-    replaced_text = re.sub(
-        r"[^\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FFF\u3400-\u4DBF"
-        + "".join(punctuation)
-        + r"]+",
-        "",
-        replaced_text,
-    )
+def replace_punctuation(text):
+    replaced_text = _replace_rep_map(text)
+    replaced_text = _non_japanese_re.sub("", replaced_text)
 
     return replaced_text
 
@@ -545,6 +570,11 @@ kakasi.setMode("H", "K")  # Hiragana to Katakana
 # Convert Chinese characters to Katakana
 conv = kakasi.getConverter()
 
+NORMALIZE_CACHE_SIZE = 4096
+
+
+# kakasi is the slow part of normalization, repeated sentences skip it
+@lru_cache(maxsize=NORMALIZE_CACHE_SIZE)
 def text_normalize(text):
     res = unicodedata.normalize("NFKC", text)
     res = japanese_convert_numbers_to_words(res)
@@ -554,23 +584,13 @@ def text_normalize(text):
     return res
 
 
-def distribute_phone(n_phone, n_word):
-    phones_per_word = [0] * n_word
-    for task in range(n_phone):
-        min_tasks = min(phones_per_word)
-        min_index = phones_per_word.index(min_tasks)
-        phones_per_word[min_index] += 1
-    return phones_per_word
-
-
-
 # tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
 
-model_id = 'tohoku-nlp/bert-base-japanese-v3'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+model_id = bert_models.LANGUAGE_MODELS['JP']
+_symbol_set = frozenset(symbols)
 def g2p(norm_text):
 
-    tokenized = tokenizer.tokenize(norm_text)
+    tokenized = bert_models.get_tokenizer(model_id).tokenize(norm_text)
     phs = []
     ph_groups = []
     for t in tokenized:
@@ -596,7 +616,7 @@ def g2p(norm_text):
         phonemes = kata2phoneme(text)
         # phonemes = [i for i in phonemes if i in symbols]
         for i in phonemes:
-            assert i in symbols, (group, norm_text, tokenized, i)
+            assert i in _symbol_set, (group, norm_text, tokenized, i)
         phone_len = len(phonemes)
         word_len = len(group)
 
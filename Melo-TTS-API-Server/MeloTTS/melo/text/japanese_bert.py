@@ -1,49 +1,26 @@
 import torch
-from transformers import AutoTokenizer, AutoModelForMaskedLM
-import sys
 
+from . import bert_models
+from .bert_features import expand_to_phones
 
-models = {}
-tokenizers = {}
-def get_bert_feature(text, word2ph, device=None, model_id='tohoku-nlp/bert-base-japanese-v3'):
-    global model
-    global tokenizer
-
-    if (
-        sys.platform == "darwin"
-        and torch.backends.mps.is_available()
-        and device == "cpu"
-    ):
-        device = "mps"
-    if not device:
-        device = "cuda"
-    if model_id not in models:
-        model = AutoModelForMaskedLM.from_pretrained(model_id).to(
-            device
-        )
-        models[model_id] = model
-        tokenizer = AutoTokenizer.from_pretrained(model_id)
-        tokenizers[model_id] = tokenizer
-    else:
-        model = models[model_id]
-        tokenizer = tokenizers[model_id]
 
+def get_bert_feature(text, word2ph, device=None, model_id=bert_models.LANGUAGE_MODELS['JP']):
+    return get_bert_feature_batch([text], [word2ph], device=device, model_id=model_id)[0]
 
+def get_bert_feature_batch(texts, word2phs, device=None, model_id=bert_models.LANGUAGE_MODELS['JP']):
+    device = bert_models.resolve_device(device)
+    tokenizer = bert_models.get_tokenizer(model_id)
+    model = bert_models.get_model(model_id, device)
     with torch.no_grad():
-        inputs = tokenizer(text, return_tensors="pt")
-        tokenized = tokenizer.tokenize(text)
+        inputs = tokenizer(texts, padding=True, return_tensors="pt")
         for i in inputs:
             inputs[i] = inputs[i].to(device)
-        res = model(**inputs, output_hidden_states=True)
-        res = torch.cat(res["hidden_states"][-3:-2], -1)[0].cpu()
-
-    assert inputs["input_ids"].shape[-1] == len(word2ph), f"{inputs['input_ids'].shape[-1]}/{len(word2ph)}"
-    word2phone = word2ph
-    phone_level_feature = []
-    for i in range(len(word2phone)):
-        repeat_feature = res[i].repeat(word2phone[i], 1)
-        phone_level_feature.append(repeat_feature)
+        res = model(**inputs)
 
-    phone_level_feature = torch.cat(phone_level_feature, dim=0)
+    lengths = inputs["attention_mask"].sum(-1).tolist()
+    features = []
+    for res_i, length, word2phone in zip(res, lengths, word2phs):
+        assert length == len(word2phone), f"{length}/{len(word2phone)}"
+        features.append(expand_to_phones(res_i, word2phone))
 
-    return phone_level_feature.T
+    return features
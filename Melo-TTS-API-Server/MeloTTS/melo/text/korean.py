@@ -2,10 +2,12 @@
 # compatible with Julius https://github.com/julius-speech/segmentation-kit
 import re
 import unicodedata
+from functools import lru_cache
 
-from transformers import AutoTokenizer
 
 from . import punctuation, symbols
+from . import bert_models
+from .frontend_utils import compile_replacements, distribute_phone
 
 
 from num2words import num2words
@@ -13,34 +15,45 @@ from melo.text.ko_dictionary import english_dictionary, etc_dictionary
 from anyascii import anyascii
 from jamo import hangul_to_jamo
 
+_hanja_re = re.compile("[⺀-⺙⺛-⻳⼀-⿕々〇〡-〩〸-〺〻㐀-䶵一-鿃豈-鶴侮-頻並-龎]")
+_english_word_re = re.compile("([A-Za-z]+)")
+_replace_etc = compile_replacements(etc_dictionary)
+
+
 def normalize(text):
     text = text.strip()
-    text = re.sub("[⺀-⺙⺛-⻳⼀-⿕々〇〡-〩〸-〺〻㐀-䶵一-鿃豈-鶴侮-頻並-龎]", "", text)
-    text = normalize_with_dictionary(text, etc_dictionary)
+    text = _hanja_re.sub("", text)
+    text = _replace_etc(text)
     text = normalize_english(text)
     text = text.lower()
     return text
 
 
 def normalize_with_dictionary(text, dic):
-    if any(key in text for key in dic.keys()):
-        pattern = re.compile("|".join(re.escape(key) for key in dic.keys()))
-        return pattern.sub(lambda x: dic[x.group()], text)
-    return text
+    if dic is etc_dictionary:
+        return _replace_etc(text)
+    return compile_replacements(dic)(text)
 
 
-def normalize_english(text):
-    def fn(m):
-        word = m.group()
-        if word in english_dictionary:
-            return english_dictionary.get(word)
-        return word
+def _english_word(m):
+    word = m.group()
+    return english_dictionary.get(word, word)
 
-    text = re.sub("([A-Za-z]+)", fn, text)
-    return text
+
+def normalize_english(text):
+    return _english_word_re.sub(_english_word, text)
 
 
 g2p_kr = None
+def get_g2p_kr():
+    global g2p_kr  # pylint: disable=global-statement
+    if g2p_kr is None:
+        from g2pkk import G2p
+
+        g2p_kr = G2p()
+    return g2p_kr
+
+
 def korean_text_to_phonemes(text, character: str = "hangeul") -> str:
     """
 
@@ -52,11 +65,7 @@ def korean_text_to_phonemes(text, character: str = "hangeul") -> str:
         output = '하늘' (Unicode :\u1112\u1161\u1102\u1173\u11af), (ᄒ + ᅡ + ᄂ + ᅳ + ᆯ)
 
     """
-    global g2p_kr  # pylint: disable=global-statement
-    if g2p_kr is None:
-        from g2pkk import G2p
-
-        g2p_kr = G2p()
+    g2p_kr = get_g2p_kr()
 
     if character == "english":
         from anyascii import anyascii
@@ -79,23 +88,50 @@ def text_normalize(text):
     return text
 
 
-def distribute_phone(n_phone, n_word):
-    phones_per_word = [0] * n_word
-    for task in range(n_phone):
-        min_tasks = min(phones_per_word)
-        min_index = phones_per_word.index(min_tasks)
-        phones_per_word[min_index] += 1
-    return phones_per_word
+# tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
+
+model_id = bert_models.LANGUAGE_MODELS['KR']
 
+WORD_CACHE_SIZE = 16384
 
 
-# tokenizer = AutoTokenizer.from_pretrained('cl-tohoku/bert-base-japanese-v3')
+@lru_cache(maxsize=WORD_CACHE_SIZE)
+def word_to_phonemes(text):
+    """Jamo of a word pronounced on its own, for tokens the sentence pronunciation can't be mapped onto"""
+    return korean_text_to_phonemes(text)
+
+
+def _is_syllable(char):
+    return "\uac00" <= char <= "\ud7a3"
+
+
+def pronounce_sentence(norm_text):
+    """Pronounce a normalized sentence with one g2pkk call, so sound changes across words apply.
+
+    Returns the pronounced syllable of every character of `norm_text`, or None
+    for the characters of words whose pronunciation doesn't line up with them
+    syllable for syllable (e.g. spelled out numbers or English).
+    """
+    pron = get_g2p_kr()(norm_text)
+    chars = [None] * len(norm_text)
+    words = norm_text.split(" ")
+    pron_words = pron.split(" ")
+    if len(words) != len(pron_words):
+        return chars
+    start = 0
+    for word, pron_word in zip(words, pron_words):
+        if len(word) == len(pron_word) and all(
+            _is_syllable(a) and _is_syllable(b) or a == b for a, b in zip(word, pron_word)
+        ):
+            chars[start:start + len(word)] = pron_word
+        start += len(word) + 1
+    return chars
 
-model_id = 'kykim/bert-kor-base'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
 
 def g2p(norm_text):
-    tokenized = tokenizer.tokenize(norm_text)
+    tokenized = bert_models.get_tokenizer(model_id).tokenize(norm_text)
+    pron_chars = pronounce_sentence(norm_text)
+    cursor = 0
     phs = []
     ph_groups = []
     for t in tokenized:
@@ -116,10 +152,16 @@ def g2p(norm_text):
             phs += [text]
             word2ph += [1]
             continue
-        # import pdb; pdb.set_trace()
-        # phonemes = japanese_text_to_phonemes(text)
-        # text = g2p_kr(text)
-        phonemes = korean_text_to_phonemes(text)
+        # Map the token back onto the sentence to take its part of the pronunciation
+        token = unicodedata.normalize("NFC", text)
+        start = norm_text.find(token, cursor)
+        end = start + len(token)
+        if start >= 0:
+            cursor = end
+        if start >= 0 and None not in pron_chars[start:end]:
+            phonemes = "".join(hangul_to_jamo("".join(pron_chars[start:end])))
+        else:
+            phonemes = word_to_phonemes(text)
         # import pdb; pdb.set_trace()
         # # phonemes = [i for i in phonemes if i in symbols]
         # for i in phonemes:
@@ -138,10 +180,14 @@ def g2p(norm_text):
     assert len(word2ph) == len(tokenized) + 2
     return phones, tones, word2ph
 
-def get_bert_feature(text, word2ph, device='cuda'):
+def get_bert_feature(text, word2ph, device=None):
     from . import japanese_bert
     return japanese_bert.get_bert_feature(text, word2ph, device=device, model_id=model_id)
 
+def get_bert_feature_batch(texts, word2phs, device=None):
+    from . import japanese_bert
+    return japanese_bert.get_bert_feature_batch(texts, word2phs, device=device, model_id=model_id)
+
 
 if __name__ == "__main__":
     # tokenizer = AutoTokenizer.from_pretrained("./bert/bert-base-japanese-v3")
@@ -3,19 +3,12 @@ import os
 import re
 
 from . import symbols
+from . import bert_models
+from .frontend_utils import distribute_phone
 from .es_phonemizer import cleaner as es_cleaner
 from .es_phonemizer import es_to_ipa
-from transformers import AutoTokenizer
 
 
-def distribute_phone(n_phone, n_word):
-    phones_per_word = [0] * n_word
-    for task in range(n_phone):
-        min_tasks = min(phones_per_word)
-        min_index = phones_per_word.index(min_tasks)
-        phones_per_word[min_index] += 1
-    return phones_per_word
-
 def text_normalize(text):
     text = es_cleaner.spanish_cleaners(text)
     return text
@@ -62,12 +55,11 @@ def refine_syllables(syllables):
 
 
 # model_id = 'bert-base-uncased'
-model_id = 'dccuchile/bert-base-spanish-wwm-uncased'
-tokenizer = AutoTokenizer.from_pretrained(model_id)
+model_id = bert_models.LANGUAGE_MODELS['SP']
 
 def g2p(text, pad_start_end=True, tokenized=None):
     if tokenized is None:
-        tokenized = tokenizer.tokenize(text)
+        tokenized = bert_models.get_tokenizer(model_id).tokenize(text)
     # import pdb; pdb.set_trace()
     phs = []
     ph_groups = []
@@ -81,14 +73,16 @@ def g2p(text, pad_start_end=True, tokenized=None):
     tones = []
     word2ph = []
     # print(ph_groups)
-    for group in ph_groups:
-        w = "".join(group)
+    # Phonemize the sentence's words together, each word still on its own
+    words = ["".join(group) for group in ph_groups]
+    ipas = iter(es_to_ipa.es2ipa_words([w for w in words if w != '[UNK]']))
+    for group, w in zip(ph_groups, words):
         phone_len = 0
         word_len = len(group)
         if w == '[UNK]':
             phone_list = ['UNK']
         else:
-            phone_list = list(filter(lambda p: p != " ", es_to_ipa.es2ipa(w)))
+            phone_list = list(filter(lambda p: p != " ", next(ipas)))
         
         for ph in phone_list:
             phones.append(ph)
@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+from functools import lru_cache
 from typing import List
 from typing import Tuple
 
@@ -18,10 +19,35 @@ import jieba
 from pypinyin import lazy_pinyin
 from pypinyin import Style
 
+CACHE_SIZE = 16384
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _finals_tone3(word: str) -> Tuple[str, ...]:
+    return tuple(lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3))
+
+
+@lru_cache(maxsize=CACHE_SIZE)
+def _search_split(word: str) -> Tuple[str, str]:
+    word_list = jieba.cut_for_search(word)
+    word_list = sorted(word_list, key=lambda i: len(i), reverse=False)
+    first_subword = word_list[0]
+    first_begin_idx = word.find(first_subword)
+    if first_begin_idx == 0:
+        second_subword = word[len(first_subword) :]
+        return first_subword, second_subword
+    second_subword = word[: -len(first_subword)]
+    return second_subword, first_subword
+
+
+def clear_cache():
+    _finals_tone3.cache_clear()
+    _search_split.cache_clear()
+
 
 class ToneSandhi:
     def __init__(self):
-        self.must_neural_tone_words = {
+        self.must_neural_tone_words = frozenset({
             "麻烦",
             "麻利",
             "鸳鸯",
@@ -442,8 +468,8 @@ class ToneSandhi:
             "咖喱",
             "扫把",
             "惦记",
-        }
-        self.must_not_neural_tone_words = {
+        })
+        self.must_not_neural_tone_words = frozenset({
             "男子",
             "女子",
             "分子",
@@ -455,7 +481,7 @@ class ToneSandhi:
             "电子",
             "人人",
             "虎虎",
-        }
+        })
         self.punc = "：，；。？！“”‘’':,;.?!"
 
     # the meaning of jieba pos tag: https://blog.csdn.net/weixin_44174352/article/details/113731041
@@ -516,7 +542,7 @@ class ToneSandhi:
                 or word[-2:] in self.must_neural_tone_words
             ):
                 finals_list[i][-1] = finals_list[i][-1][:-1] + "5"
-        finals = sum(finals_list, [])
+        finals = finals_list[0] + finals_list[1]
         return finals
 
     def _bu_sandhi(self, word: str, finals: List[str]) -> List[str]:
@@ -556,17 +582,8 @@ class ToneSandhi:
         return finals
 
     def _split_word(self, word: str) -> List[str]:
-        word_list = jieba.cut_for_search(word)
-        word_list = sorted(word_list, key=lambda i: len(i), reverse=False)
-        first_subword = word_list[0]
-        first_begin_idx = word.find(first_subword)
-        if first_begin_idx == 0:
-            second_subword = word[len(first_subword) :]
-            new_word_list = [first_subword, second_subword]
-        else:
-            second_subword = word[: -len(first_subword)]
-            new_word_list = [second_subword, first_subword]
-        return new_word_list
+        # jieba's search cut of a word doesn't change, compute it once per word
+        return list(_search_split(word))
 
     def _three_sandhi(self, word: str, finals: List[str]) -> List[str]:
         if len(word) == 2 and self._all_tone_three(finals):
@@ -596,7 +613,7 @@ class ToneSandhi:
                             and finals_list[0][-1][-1] == "3"
                         ):
                             finals_list[0][-1] = finals_list[0][-1][:-1] + "2"
-                        finals = sum(finals_list, [])
+                        finals = finals_list[0] + finals_list[1]
         # split idiom into two words who's length is 2
         elif len(word) == 4:
             finals_list = [finals[:2], finals[2:]]
@@ -670,17 +687,13 @@ class ToneSandhi:
         self, seg: List[Tuple[str, str]]
     ) -> List[Tuple[str, str]]:
         new_seg = []
-        sub_finals_list = [
-            lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
-            for (word, pos) in seg
-        ]
-        assert len(sub_finals_list) == len(seg)
+        all_tone_three = [self._all_tone_three(_finals_tone3(word)) for (word, pos) in seg]
         merge_last = [False] * len(seg)
         for i, (word, pos) in enumerate(seg):
             if (
                 i - 1 >= 0
-                and self._all_tone_three(sub_finals_list[i - 1])
-                and self._all_tone_three(sub_finals_list[i])
+                and all_tone_three[i - 1]
+                and all_tone_three[i]
                 and not merge_last[i - 1]
             ):
                 # if the last word is reduplication, not merge, because reduplication need to be _neural_sandhi
@@ -705,11 +718,7 @@ class ToneSandhi:
         self, seg: List[Tuple[str, str]]
     ) -> List[Tuple[str, str]]:
         new_seg = []
-        sub_finals_list = [
-            lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
-            for (word, pos) in seg
-        ]
-        assert len(sub_finals_list) == len(seg)
+        sub_finals_list = [_finals_tone3(word) for (word, pos) in seg]
         merge_last = [False] * len(seg)
         for i, (word, pos) in enumerate(seg):
             if (
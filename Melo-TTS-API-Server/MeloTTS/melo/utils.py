@@ -9,7 +9,7 @@ from scipy.io.wavfile import read
 import torch
 import torchaudio
 import librosa
-from melo.text import cleaned_text_to_sequence, get_bert
+from melo.text import cleaned_text_to_arrays, get_bert, get_bert_batch
 from melo.text.cleaner import clean_text
 from melo import commons
 
@@ -19,44 +19,66 @@ logger = logging.getLogger(__name__)
 
 
 
-def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
+def _clean_text_for_tts_infer(text, language_str, hps, symbol_to_id=None):
     norm_text, phone, tone, word2ph = clean_text(text, language_str)
-    phone, tone, language = cleaned_text_to_sequence(phone, tone, language_str, symbol_to_id)
+    phone, tone, language = cleaned_text_to_arrays(phone, tone, language_str, symbol_to_id)
+    word2ph = np.asarray(word2ph, dtype=np.int64)
 
     if hps.data.add_blank:
-        phone = commons.intersperse(phone, 0)
-        tone = commons.intersperse(tone, 0)
-        language = commons.intersperse(language, 0)
-        for i in range(len(word2ph)):
-            word2ph[i] = word2ph[i] * 2
+        phone = commons.intersperse_array(phone, 0)
+        tone = commons.intersperse_array(tone, 0)
+        language = commons.intersperse_array(language, 0)
+        word2ph = word2ph * 2
         word2ph[0] += 1
+    return norm_text, phone, tone, language, word2ph
+
 
+def _assemble_text_for_tts_infer(bert, phone, tone, language, language_str, hps):
+    # The BERT stream a language does not use is None rather than zeros, the
+    # text encoder adds its projection's bias instead
     if getattr(hps.data, "disable_bert", False):
-        bert = torch.zeros(1024, len(phone))
-        ja_bert = torch.zeros(768, len(phone))
+        bert = None
+        ja_bert = None
     else:
-        bert = get_bert(norm_text, word2ph, language_str, device)
-        del word2ph
-        assert bert.shape[-1] == len(phone), phone
+        assert bert.shape[-1] == len(
+            phone
+        ), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
 
         if language_str == "ZH":
             bert = bert
-            ja_bert = torch.zeros(768, len(phone))
+            ja_bert = None
         elif language_str in ["JP", "EN", "ZH_MIX_EN", 'KR', 'SP', 'ES', 'FR', 'DE', 'RU']:
             ja_bert = bert
-            bert = torch.zeros(1024, len(phone))
+            bert = None
         else:
             raise NotImplementedError()
 
-    assert bert.shape[-1] == len(
-        phone
-    ), f"Bert seq len {bert.shape[-1]} != {len(phone)}"
-
-    phone = torch.LongTensor(phone)
-    tone = torch.LongTensor(tone)
-    language = torch.LongTensor(language)
+    phone = torch.from_numpy(phone)
+    tone = torch.from_numpy(tone)
+    language = torch.from_numpy(language)
     return bert, ja_bert, phone, tone, language
 
+
+def get_text_for_tts_infer(text, language_str, hps, device, symbol_to_id=None):
+    norm_text, phone, tone, language, word2ph = _clean_text_for_tts_infer(text, language_str, hps, symbol_to_id)
+    bert = None
+    if not getattr(hps.data, "disable_bert", False):
+        bert = get_bert(norm_text, word2ph, language_str, device)
+    del word2ph
+    return _assemble_text_for_tts_infer(bert, phone, tone, language, language_str, hps)
+
+
+def get_text_for_tts_infer_batch(texts, language_str, hps, device, symbol_to_id=None):
+    """get_text_for_tts_infer for several sentences, sharing one BERT forward pass."""
+    cleaned = [_clean_text_for_tts_infer(text, language_str, hps, symbol_to_id) for text in texts]
+    berts = [None] * len(cleaned)
+    if not getattr(hps.data, "disable_bert", False):
+        berts = get_bert_batch([c[0] for c in cleaned], [c[4] for c in cleaned], language_str, device)
+    return [
+        _assemble_text_for_tts_infer(bert, phone, tone, language, language_str, hps)
+        for bert, (_, phone, tone, language, _) in zip(berts, cleaned)
+    ]
+
 def load_checkpoint(checkpoint_path, model, optimizer=None, skip_optimizer=False):
     assert os.path.isfile(checkpoint_path)
     checkpoint_dict = torch.load(checkpoint_path, map_location="cpu")
@@ -0,0 +1,39 @@
+import time
+import tracemalloc
+
+import numpy as np
+
+from melo.api import TTS
+
+
+def audio_numpy_concat_legacy(segment_data_list, sr, speed=1.):
+    # The list based implementation TTS.audio_numpy_concat used to have
+    audio_segments = []
+    for segment_data in segment_data_list:
+        audio_segments += segment_data.reshape(-1).tolist()
+        audio_segments += [0] * int((sr * 0.05) / speed)
+    audio_segments = np.array(audio_segments).astype(np.float32)
+    return audio_segments
+
+
+def measure(fn, segments, sr):
+    tracemalloc.start()
+    start = time.perf_counter()
+    audio = fn(segments, sr=sr)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return audio, elapsed, peak
+
+
+if __name__ == '__main__':
+    sr = 44100
+    # One minute of audio split into 20 sentences of 3 seconds
+    segments = [np.random.uniform(-1, 1, 3 * sr).astype(np.float32) for _ in range(20)]
+
+    legacy, legacy_time, legacy_peak = measure(audio_numpy_concat_legacy, segments, sr)
+    new, new_time, new_peak = measure(TTS.audio_numpy_concat, segments, sr)
+    assert np.array_equal(legacy, new)
+
+    print(f'legacy:     {legacy_time * 1000:8.1f} ms  peak {legacy_peak / 2 ** 20:8.1f} MB')
+    print(f'vectorized: {new_time * 1000:8.1f} ms  peak {new_peak / 2 ** 20:8.1f} MB')
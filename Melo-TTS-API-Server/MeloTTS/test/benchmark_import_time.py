@@ -0,0 +1,53 @@
+import subprocess
+import sys
+
+# Each scenario runs in a fresh interpreter started with -X importtime.
+# "eager" imports every frontend the way melo.text.cleaner used to.
+LANGUAGES = ('ZH', 'JP', 'EN', 'ZH_MIX_EN', 'KR', 'FR', 'SP')
+SCENARIOS = {'cleaner only': "import melo.text.cleaner"}
+for language in LANGUAGES:
+    SCENARIOS[language] = f"import melo.text.cleaner; melo.text.get_frontend({language!r})"
+SCENARIOS['eager'] = (
+    "import melo.text.cleaner\n"
+    f"for language in {LANGUAGES!r}:\n"
+    "    melo.text.get_frontend(language)"
+)
+
+REPORT = (
+    "\nimport resource, sys\n"
+    "rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss\n"
+    "print(rss * 1024 if sys.platform != 'darwin' else rss)\n"
+)
+
+
+def run(code):
+    proc = subprocess.run(
+        [sys.executable, '-X', 'importtime', '-c', code + REPORT],
+        capture_output=True,
+        text=True,
+    )
+    if proc.returncode != 0:
+        errors = [
+            line for line in proc.stderr.splitlines()
+            if line.strip() and not line.startswith(('import time:', '*', ' '))
+        ]
+        return None, None, errors[-1]
+    # Lines look like "import time: self [us] | cumulative | imported package",
+    # nesting is shown by indenting the package name; sum the top-level ones
+    total_us = 0
+    for line in proc.stderr.splitlines():
+        if not line.startswith('import time:') or 'cumulative' in line:
+            continue
+        _, cumulative, name = line[len('import time:'):].split('|')
+        if not name.startswith('  '):
+            total_us += int(cumulative)
+    return total_us, int(proc.stdout.strip().splitlines()[-1]), None
+
+
+if __name__ == '__main__':
+    for name, code in SCENARIOS.items():
+        total_us, rss, error = run(code)
+        if error:
+            print(f'{name:14s} failed: {error}')
+        else:
+            print(f'{name:14s} imports {total_us / 1e6:6.2f} s  max RSS {rss / 2 ** 20:7.1f} MB')
@@ -0,0 +1,130 @@
+import importlib
+import os
+import re
+import time
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'basetts_test_resources')
+
+# Lines exercising the abbreviation rules, the example corpora have next to none
+EXTRA_LINES = {
+    'fr': [
+        "M. Dupont et Mme Martin ont rdv. au no. 12 av. Victor Hugo, c.-à-d. chez le Dr. Petit.",
+        "Mlle Durand, Mlles Roy, Mmes Blanc : le boul. St. Laurent, art. 3, etc. N.B. min. 5, max. 10.",
+        "En 52 av. J.-C. puis en 14 apr. J.-C., p.c.q. le Pr. avait qqch. ex. excl. col. sgt. capt. jr. co.",
+    ],
+    'en': [
+        "Mr. and Mrs. Smith met Dr. Jones at St. Mary's, Co. Ltd., with Lt. Col. Brown and Capt. Hook.",
+        "Gen. Lee, Maj. Reed, Sgt. Pepper, Rev. Green, Hon. Judge Wu, Jr., Esq., drs. of Ft. Worth.",
+    ],
+}
+
+
+def read_corpus(name):
+    with open(os.path.join(RESOURCES, f'{name}_egs_text.txt')) as f:
+        return [line.strip() for line in f if line.strip()] + EXTRA_LINES.get(name, [])
+
+
+def replace_map_legacy(rep_map):
+    # The alternation used to be rebuilt on every call
+    def replace(text):
+        pattern = re.compile("|".join(re.escape(p) for p in rep_map.keys()))
+        return pattern.sub(lambda x: rep_map[x.group()], text)
+    return replace
+
+
+def expand_abbreviations_legacy(abbreviations):
+    # One re.sub per abbreviation
+    def expand(text):
+        for regex, replacement in abbreviations:
+            text = re.sub(regex, replacement, text)
+        return text
+    return expand
+
+
+def chinese_legacy(module):
+    replace = replace_map_legacy(module.rep_map)
+    if module.__name__.endswith('chinese_mix'):
+        def replace_punctuation(text):
+            text = replace(text.replace("嗯", "恩").replace("呣", "母"))
+            text = re.sub(r"[^\u4e00-\u9fa5_a-zA-Z\s" + "".join(module.punctuation) + r"]+", "", text)
+            return re.sub(r"[\s]+", " ", text)
+    else:
+        def replace_punctuation(text):
+            text = replace(text.replace("嗯", "恩").replace("呣", "母"))
+            return re.sub(r"[^\u4e00-\u9fa5" + "".join(module.punctuation) + r"]+", "", text)
+    return replace_punctuation
+
+
+def japanese_legacy(module):
+    replace = replace_map_legacy(module.rep_map)
+
+    def replace_punctuation(text):
+        return re.sub(
+            r"[^\u3040-\u309F\u30A0-\u30FF\u4E00-\u9FFF\u3400-\u4DBF" + "".join(module.punctuation) + r"]+",
+            "",
+            replace(text),
+        )
+    return replace_punctuation
+
+
+def korean_legacy(module):
+    def normalize(text):
+        text = text.strip()
+        text = re.sub("[⺀-⺙⺛-⻳⼀-⿕々〇〡-〩〸-〺〻㐀-䶵一-鿃豈-鶴侮-頻並-龎]", "", text)
+        if any(key in text for key in module.etc_dictionary.keys()):
+            pattern = re.compile("|".join(re.escape(key) for key in module.etc_dictionary.keys()))
+            text = pattern.sub(lambda x: module.etc_dictionary[x.group()], text)
+
+        def fn(m):
+            word = m.group()
+            if word in module.english_dictionary:
+                return module.english_dictionary.get(word)
+            return word
+
+        return re.sub("([A-Za-z]+)", fn, text).lower()
+    return normalize
+
+
+# name -> (corpus, module, function name, legacy implementation factory)
+CASES = {
+    'ZH punctuation': ('zh_mix_en', 'melo.text.chinese', 'replace_punctuation', chinese_legacy),
+    'ZH_MIX_EN punctuation': ('zh_mix_en', 'melo.text.chinese_mix', 'replace_punctuation', chinese_legacy),
+    'JP punctuation': ('jp', 'melo.text.japanese', 'replace_punctuation', japanese_legacy),
+    'KR normalize': ('kr', 'melo.text.korean', 'normalize', korean_legacy),
+    'FR punctuation': ('fr', 'melo.text.fr_phonemizer.cleaner', 'replace_punctuation',
+                       lambda m: replace_map_legacy(m.rep_map)),
+    'FR abbreviations': ('fr', 'melo.text.fr_phonemizer.cleaner', 'expand_abbreviations',
+                         lambda m: expand_abbreviations_legacy(m.abbreviations_fr)),
+    'ES punctuation': ('es', 'melo.text.es_phonemizer.cleaner', 'replace_punctuation',
+                       lambda m: replace_map_legacy(m.rep_map)),
+    'EN abbreviations': ('en', 'melo.text.english_utils.abbreviations', 'expand_abbreviations',
+                         lambda m: expand_abbreviations_legacy(m.abbreviations_en)),
+}
+
+
+def measure(fn, lines, repeat=20):
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for line in lines:
+            fn(line)
+        best = min(best, time.perf_counter() - start)
+    return best / len(lines)
+
+
+if __name__ == '__main__':
+    for name, (corpus, module_name, function_name, legacy_factory) in CASES.items():
+        try:
+            module = importlib.import_module(module_name)
+        except Exception as e:
+            print(f'{name:22s} skipped: {type(e).__name__}: {str(e).strip().splitlines()[0]}')
+            continue
+        lines = read_corpus(corpus)
+        new = getattr(module, function_name)
+        legacy = legacy_factory(module)
+        for line in lines:
+            assert new(line) == legacy(line), line
+        legacy_time = measure(legacy, lines)
+        new_time = measure(new, lines)
+        print(f'{name:22s} legacy {legacy_time * 1e6:7.1f} us/line  compiled {new_time * 1e6:7.1f} us/line  '
+              f'x{legacy_time / new_time:5.1f}  ({len(lines)} lines)')
@@ -0,0 +1,75 @@
+import os
+import sys
+import time
+
+from melo.split_utils import estimate_phones, split_sentence
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'basetts_test_resources')
+CORPORA = {'EN': 'en', 'FR': 'fr', 'ES': 'es', 'ZH': 'zh', 'JP': 'jp', 'KR': 'kr'}
+BATCH_SIZE = 8
+TARGET_PHONES = 120
+FIRST_TARGET_PHONES = 30
+MODES = {
+    'sentences': {},
+    'packed': {'target_phones': TARGET_PHONES},
+    'packed, small first': {'target_phones': TARGET_PHONES, 'first_target_phones': FIRST_TARGET_PHONES},
+}
+
+
+def read_document(name):
+    with open(os.path.join(RESOURCES, f'{name}_egs_text.txt')) as f:
+        return ' '.join(line.strip() for line in f if line.strip())
+
+
+def phone_counter(language, sample):
+    # The frontend's phone counts when it can run here, the estimate otherwise
+    from melo.text.cleaner import clean_text
+    try:
+        clean_text(sample, language)
+    except Exception:
+        return lambda text: round(estimate_phones(text, language)), 'estimated'
+
+    def count(text):
+        return len(clean_text(text, language)[1])
+    return count, 'G2P'
+
+
+def padding_waste(lengths, batch_size=BATCH_SIZE):
+    """Fraction of the model input that is padding when consecutive pieces are batched"""
+    padded = 0
+    for i in range(0, len(lengths), batch_size):
+        batch = lengths[i:i + batch_size]
+        # Phones are interspersed with blanks before they reach the model
+        padded += len(batch) * (2 * max(batch) + 1)
+    return 1 - sum(2 * n + 1 for n in lengths) / padded
+
+
+def measure_latency(tts, text, **kwargs):
+    """Seconds to the first streamed audio, and to the whole text with batched synthesis"""
+    start = time.perf_counter()
+    next(tts.tts_stream(text, 0, quiet=True, seed=0, **kwargs))
+    first = time.perf_counter() - start
+    start = time.perf_counter()
+    tts.tts_to_file(text, 0, quiet=True, batch_size=BATCH_SIZE, seed=0, **kwargs)
+    return first, time.perf_counter() - start
+
+
+if __name__ == '__main__':
+    print(f'batches of {BATCH_SIZE}, target {TARGET_PHONES} phones, first piece {FIRST_TARGET_PHONES}')
+    for language, name in CORPORA.items():
+        text = read_document(name)
+        count, source = phone_counter(language, text[:100])
+        for mode, kwargs in MODES.items():
+            lengths = [count(piece) for piece in split_sentence(text, language_str=language, **kwargs)]
+            print(f'{language} {mode:20s} {len(lengths):3d} pieces  phones ({source}) first {lengths[0]:4d} '
+                  f'min {min(lengths):4d} max {max(lengths):4d}  padding {padding_waste(lengths):6.1%}')
+
+    # End to end with a model: python test/benchmark_sentence_packing.py EN
+    for language in sys.argv[1:]:
+        from melo.api import TTS
+        tts = TTS(language=language)
+        text = read_document(CORPORA[language])
+        measure_latency(tts, text[:200])  # warm up
+        for mode, kwargs in MODES.items():
+            first, total = measure_latency(tts, text, **kwargs)
+            print(f'{language} {mode:20s} first audio {first * 1000:7.1f} ms  whole text {total * 1000:8.1f} ms')
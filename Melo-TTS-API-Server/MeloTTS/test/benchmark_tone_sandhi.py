@@ -0,0 +1,52 @@
+import os
+import time
+
+from melo.text import chinese, tone_sandhi
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'basetts_test_resources')
+SANDHI_METHODS = ('pre_merge_for_modify', 'modified_tone')
+
+
+class SandhiTimer:
+    """Accumulates the time spent in the frontend's ToneSandhi entry points"""
+
+    def __init__(self, tone_modifier):
+        self.elapsed = 0.
+        for name in SANDHI_METHODS:
+            setattr(tone_modifier, name, self.wrap(getattr(tone_modifier, name)))
+
+    def wrap(self, fn):
+        def timed(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                self.elapsed += time.perf_counter() - start
+        return timed
+
+
+def clear_caches():
+    chinese._word_g2p.cache_clear()
+    tone_sandhi.clear_cache()
+
+
+def measure(text, timer):
+    timer.elapsed = 0.
+    start = time.perf_counter()
+    chinese.g2p(text)
+    return time.perf_counter() - start, timer.elapsed
+
+
+if __name__ == '__main__':
+    with open(os.path.join(RESOURCES, 'zh_egs_text.txt')) as f:
+        passage = ''.join(line.strip() for line in f)
+    # A long passage: the example sentences repeated, the way a book repeats its vocabulary
+    text = chinese.text_normalize(passage * 10)
+    chinese.g2p(chinese.text_normalize(passage[:20]))  # load jieba's dictionary
+    timer = SandhiTimer(chinese.tone_modifier)
+
+    clear_caches()
+    for name in ('cold', 'warm'):
+        total, sandhi = measure(text, timer)
+        print(f'{name}: frontend {total * 1000:7.1f} ms  tone sandhi {sandhi * 1000:7.1f} ms '
+              f'({sandhi / total:5.1%})  {len(text)} characters')
@@ -0,0 +1,24 @@
+import os
+import random
+
+import pytest
+
+RESOURCES = os.path.join(os.path.dirname(__file__), 'basetts_test_resources')
+
+# Scripts that synthesize the example texts with a downloaded checkpoint, run by hand
+collect_ignore = ['test_base_model_tts_package.py', 'test_base_model_tts_package_from_S3.py']
+
+
+@pytest.fixture
+def rng():
+    """Random inputs that are the same on every run"""
+    return random.Random(0)
+
+
+@pytest.fixture
+def egs_text():
+    """Reader for the example text of a language, e.g. egs_text('en')"""
+    def read(name):
+        with open(os.path.join(RESOURCES, f'{name}_egs_text.txt')) as f:
+            return f.read()
+    return read
@@ -0,0 +1,33 @@
+import torch
+
+from melo.text.bert_features import expand_to_phones
+
+
+def expand_to_phones_loop(features, word2ph):
+    # The per-token loop the *_bert modules used before expand_to_phones
+    phone_level_feature = []
+    for i in range(len(word2ph)):
+        repeat_feature = features[i].repeat(word2ph[i], 1)
+        phone_level_feature.append(repeat_feature)
+    return torch.cat(phone_level_feature, dim=0).T
+
+
+def test_matches_loop(rng):
+    for _ in range(200):
+        n_tokens = rng.randint(1, 40)
+        word2ph = [rng.randint(0, 4) for _ in range(n_tokens)]
+        word2ph[0] = max(word2ph[0], 1)
+        padding = rng.randint(0, 5)
+        features = torch.randn(n_tokens + padding, 16)
+        expected = expand_to_phones_loop(features, word2ph)
+        result = expand_to_phones(features, word2ph)
+        assert result.shape == (16, sum(word2ph))
+        assert torch.equal(result, expected)
+
+
+def test_keeps_device():
+    devices = ['cpu'] + (['cuda'] if torch.cuda.is_available() else [])
+    for device in devices:
+        features = torch.randn(3, 8, device=device)
+        result = expand_to_phones(features, [1, 2, 1])
+        assert result.device == features.device
@@ -0,0 +1,84 @@
+import re
+
+import jieba.posseg as psg
+from pypinyin import lazy_pinyin, Style
+
+from melo.text import chinese
+
+# Normalized text, split after punctuation the way chinese.g2p does
+SENTENCES = [
+    "我们不怕困难,",
+    "你想一想,",
+    "老奶奶坐在门口的小板凳上,",
+    "第一次坐飞机的时候,",
+    "她紧张得说不出话来.",
+    "!",
+]
+
+
+
+def g2p_loop(segments):
+    # The per-sentence jieba cut and per-word pypinyin calls chinese._g2p used before
+    phones_list = []
+    tones_list = []
+    word2ph = []
+    for seg in segments:
+        seg = re.sub("[a-zA-Z]+", "", seg)
+        seg_cut = chinese.tone_modifier.pre_merge_for_modify(psg.lcut(seg))
+        initials = []
+        finals = []
+        for word, pos in seg_cut:
+            if pos == "eng":
+                continue
+            sub_initials = lazy_pinyin(word, neutral_tone_with_five=True, style=Style.INITIALS)
+            sub_finals = lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
+            initials += sub_initials
+            finals += chinese.tone_modifier.modified_tone(word, pos, sub_finals)
+        for c, v in zip(initials, finals):
+            if c == v:
+                assert c in chinese.punctuation
+                phone = [c]
+                tone = "0"
+                word2ph.append(1)
+            else:
+                v_without_tone = v[:-1]
+                tone = v[-1]
+                pinyin = c + v_without_tone
+                if c:
+                    if v_without_tone in chinese.v_rep_map:
+                        pinyin = c + chinese.v_rep_map[v_without_tone]
+                elif pinyin in chinese.pinyin_rep_map:
+                    pinyin = chinese.pinyin_rep_map[pinyin]
+                elif pinyin[0] in chinese.single_rep_map:
+                    pinyin = chinese.single_rep_map[pinyin[0]] + pinyin[1:]
+                phone = chinese.pinyin_to_symbol_map[pinyin].split(" ")
+                word2ph.append(len(phone))
+            phones_list += phone
+            tones_list += [int(tone)] * len(phone)
+    return phones_list, tones_list, word2ph
+
+
+def split_segments(line):
+    # Like SENTENCES, from a line of the example text
+    text = chinese.text_normalize(line)
+    return [s for s in chinese._sentence_split_re.split(text) if s.strip()]
+
+
+def test_initials_finals_in_one_pass():
+    for word in SENTENCES + ["你好", "一", "嗯", ","]:
+        initials, finals = chinese._get_initials_finals(word)
+        assert initials == lazy_pinyin(word, neutral_tone_with_five=True, style=Style.INITIALS)
+        assert finals == lazy_pinyin(word, neutral_tone_with_five=True, style=Style.FINALS_TONE3)
+
+
+def test_batched_cut_matches_per_sentence():
+    seg_cuts = chinese._cut_segments(SENTENCES)
+    assert seg_cuts == [[tuple(pair) for pair in psg.lcut(seg)] for seg in SENTENCES]
+
+
+def test_matches_loop(egs_text):
+    examples = [split_segments(line) for line in egs_text('zh').splitlines() if line.strip()]
+    for segments in [SENTENCES, ["你好吗?我很好!"], ["一个一个地说,", "不要着急."]] + examples:
+        phones, tones, word2ph = chinese._g2p(segments)
+        assert (phones, tones, word2ph) == g2p_loop(segments), segments
+        assert sum(word2ph) == len(phones) == len(tones)
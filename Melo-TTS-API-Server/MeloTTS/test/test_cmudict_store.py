@@ -0,0 +1,29 @@
+import os
+import tempfile
+
+from melo.text import english
+from melo.text.cmudict_store import CMUDictStore, compile_dict, load_dict
+
+
+def test_matches_cmudict():
+    g2p_dict = english.read_dict()
+    store = CMUDictStore(compile_dict(g2p_dict, english.refine_syllables))
+    assert len(store) == len(g2p_dict)
+    for word, syllables in g2p_dict.items():
+        assert store[word] == english.refine_syllables(syllables), word
+    assert 'NOT-A-CMUDICT-WORD' not in store
+    assert store.get('NOT-A-CMUDICT-WORD') is None
+
+
+def test_load_builds_and_maps_store():
+    g2p_dict = {'HELLO': [['HH', 'AH0'], ['L', 'OW1']], 'A': [['AH0']]}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        source = os.path.join(tmp_dir, 'dict.rep')
+        open(source, 'w').close()
+        path = os.path.join(tmp_dir, 'store.bin')
+        store = load_dict(path, source, lambda: g2p_dict, english.refine_syllables)
+        assert os.path.exists(path)
+        assert store['HELLO'] == (['hh', 'ah', 'l', 'ow'], [0, 1, 0, 2])
+        # A second load maps the existing file instead of rebuilding it
+        store = load_dict(path, source, lambda: {}, english.refine_syllables)
+        assert list(store) == ['A', 'HELLO']
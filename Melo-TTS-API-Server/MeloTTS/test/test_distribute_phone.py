@@ -0,0 +1,41 @@
+import pytest
+
+from melo.text.frontend_utils import distribute_phone
+
+
+def distribute_phone_loop(n_phone, n_word):
+    # The per-phone implementation the language frontends used to copy
+    phones_per_word = [0] * n_word
+    for task in range(n_phone):
+        min_tasks = min(phones_per_word)
+        min_index = phones_per_word.index(min_tasks)
+        phones_per_word[min_index] += 1
+    return phones_per_word
+
+
+@pytest.mark.parametrize('n_word', range(1, 40))
+def test_matches_loop_exhaustively(n_word):
+    for n_phone in range(0, 120):
+        assert distribute_phone(n_phone, n_word) == distribute_phone_loop(n_phone, n_word), n_phone
+
+
+def test_matches_loop(rng):
+    for _ in range(1000):
+        n_phone, n_word = rng.randint(0, 2000), rng.randint(1, 200)
+        assert distribute_phone(n_phone, n_word) == distribute_phone_loop(n_phone, n_word), (n_phone, n_word)
+
+
+def test_properties(rng):
+    for _ in range(1000):
+        n_phone, n_word = rng.randint(0, 500), rng.randint(1, 50)
+        result = distribute_phone(n_phone, n_word)
+        assert len(result) == n_word
+        assert sum(result) == n_phone
+        assert max(result) - min(result) <= 1
+        assert result == sorted(result, reverse=True)
+
+
+def test_no_words():
+    assert distribute_phone(0, 0) == distribute_phone_loop(0, 0) == []
+    with pytest.raises(ValueError):
+        distribute_phone(3, 0)
@@ -0,0 +1,49 @@
+from melo.text import japanese
+
+KATAKANA = [chr(ch) for ch in range(ord("ァ"), ord("ン") + 1)]
+
+
+def kata2phoneme_loop(text):
+    # The longest match loop kata2phoneme used before the rule trie
+    text = text.strip()
+    res = []
+    while text:
+        if len(text) >= 2:
+            x = japanese._RULEMAP2.get(text[:2])
+            if x is not None:
+                text = text[2:]
+                res += x.split(" ")[1:]
+                continue
+        x = japanese._RULEMAP1.get(text[0])
+        if x is not None:
+            text = text[1:]
+            res += x.split(" ")[1:]
+            continue
+        res.append(text[0])
+        text = text[1:]
+    return res
+
+
+def test_every_rule():
+    for rule in list(japanese._RULEMAP1) + list(japanese._RULEMAP2):
+        assert japanese.kata2phoneme(rule) == kata2phoneme_loop(rule), rule
+
+
+def test_matches_loop(rng):
+    # Rule prefixes next to letters no rule covers, so a two letter rule can start and not finish
+    pieces = list(japanese._RULEMAP1) + list(japanese._RULEMAP2) + KATAKANA + list(" ー\na、")
+    for _ in range(5000):
+        text = "".join(rng.choice(pieces) for _ in range(rng.randint(0, 12)))
+        assert japanese.kata2phoneme(text) == kata2phoneme_loop(text), text
+
+
+def test_sample_words():
+    for text in ("コンニチハ", "キャット", "ヴァイオリン", "トーキョー", "シェフ", "ティーカップ", "ッ", " アイ "):
+        assert japanese.kata2phoneme(text) == kata2phoneme_loop(text), text
+
+
+def test_results_are_not_shared():
+    # Results come from a cache, callers must still get their own list
+    first = japanese.kata2phoneme("キャット")
+    first.append("x")
+    assert japanese.kata2phoneme("キャット") == kata2phoneme_loop("キャット")
@@ -0,0 +1,39 @@
+from jamo import hangul_to_jamo
+
+from melo.text import bert_models, korean
+
+
+def jamo(text):
+    return ''.join(hangul_to_jamo(text))
+
+
+def g2p(text):
+    return korean.g2p(korean.text_normalize(text))
+
+
+def test_liaison_across_words():
+    # The final consonant of 옷 links onto 안에 only when the sentence is pronounced as a whole
+    norm = korean.text_normalize('옷 안에 넣어요.')
+    assert korean.pronounce_sentence(norm)[:4] == ['오', None, '다', '네']
+    assert korean.word_to_phonemes('안에') == jamo('아네')
+    phones, _, _ = g2p('옷 안에 넣어요.')
+    assert ''.join(phones[1:-1]) == jamo('오다네너어요') + '.'
+
+
+def test_rewritten_word_falls_back():
+    # g2pkk spells out 3, so 3개 no longer lines up with its pronunciation syllable for syllable
+    norm = korean.text_normalize('3개 샀어요.')
+    assert korean.pronounce_sentence(norm) == [None, None, None, '사', '써', '요', '.']
+    phones, _, _ = g2p('3개 샀어요.')
+    assert ''.join(phones[1:-1]) == jamo('삼개사써요') + '.'
+
+
+def test_word2ph_matches_tokens(egs_text):
+    sentences = [line.strip() for line in egs_text('kr').splitlines() if line.strip()]
+    sentences += ['꽃 위에 앉았어요.', '국물 있어요?', '3개 샀어요.', 'TV 봐요', '10% 할인']
+    tokenizer = bert_models.get_tokenizer(korean.model_id)
+    for sentence in sentences:
+        norm = korean.text_normalize(sentence)
+        phones, tones, word2ph = korean.g2p(norm)
+        assert len(word2ph) == len(tokenizer.tokenize(norm)) + 2, sentence
+        assert sum(word2ph) == len(phones) == len(tones), sentence
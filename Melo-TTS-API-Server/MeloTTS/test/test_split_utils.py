@@ -0,0 +1,67 @@
+import pytest
+
+from melo.split_utils import (
+    estimate_phones, pack_sentences, split_clauses, split_sentence, split_sentences_latin, split_sentences_latin_stream,
+    txtsplit, txtsplit_stream,
+)
+
+
+def fragment(text, size):
+    return [text[i:i + size] for i in range(0, len(text), size)]
+
+
+@pytest.mark.parametrize('name', ['en', 'fr', 'es'])
+def test_stream_matches_whole_text(egs_text, name):
+    text = egs_text(name)
+    expected = split_sentences_latin(text)
+    for size in (1, 2, 7, 64, 1000):
+        assert list(split_sentences_latin_stream(fragment(text, size))) == expected, (name, size)
+    for desired_length, max_length in ((10, 20), (100, 200)):
+        expected = txtsplit(text, desired_length, max_length)
+        for size in (1, 3, 50):
+            assert list(txtsplit_stream(fragment(text, size), desired_length, max_length)) == expected
+
+
+def test_quotes_and_punctuation_runs():
+    text = 'He said "Stop. Now!" and left... Really?! Yes.\n\nThe end'
+    # Every punctuation mark gets a space after it, so "..." and "?!" come apart
+    expected = ['He said "Stop. Now! " and left.', '. . Really?', '! Yes.', 'The end']
+    assert txtsplit(text, 5, 40) == expected
+    assert list(txtsplit_stream(fragment(text, 1), 5, 40)) == expected
+
+
+def test_chunks_yielded_before_text_ends():
+    sentence = "This sentence is long enough to be a chunk of its own. "
+
+    def fragments():
+        for _ in range(3):
+            yield sentence
+        pytest.fail('the first chunk should not wait for the end of the text')
+
+    chunks = txtsplit_stream(fragments(), 40, 80)
+    assert next(chunks) == sentence.strip()
+
+
+@pytest.mark.parametrize('language, name', [('EN', 'en'), ('ZH', 'zh')])
+def test_packed_pieces_are_balanced(egs_text, language, name):
+    text = egs_text(name)
+    clauses = split_clauses(text, language, 120)
+    pieces = split_sentence(text, language_str=language, target_phones=120)
+    assert ' '.join(pieces) == ' '.join(clauses)
+    phones = [estimate_phones(piece, language) for piece in pieces]
+    assert all(80 <= n <= 180 for n in phones), phones
+    first = split_sentence(text, language_str=language, target_phones=120, first_target_phones=30)
+    assert ' '.join(first) == ' '.join(clauses)
+    assert estimate_phones(first[0], language) < 60
+
+
+@pytest.mark.parametrize('kwargs', [
+    {'target_phones': 0}, {'target_phones': -5}, {'target_phones': 120, 'first_target_phones': 0},
+])
+def test_pack_rejects_non_positive_targets(kwargs):
+    with pytest.raises(ValueError):
+        pack_sentences(['Hello there.', 'How are you?'], 'EN', **kwargs)
+
+
+def test_pack_nothing():
+    assert pack_sentences([], 'EN', target_phones=120) == []
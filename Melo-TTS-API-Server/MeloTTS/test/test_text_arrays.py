@@ -0,0 +1,27 @@
+import numpy as np
+import torch
+
+from melo import commons
+from melo.text import cleaned_text_to_arrays, cleaned_text_to_sequence, language_id_map, symbols
+
+
+def test_arrays_match_sequence(rng):
+    for language in language_id_map:
+        for n in (0, 1, 2, 17, 300):
+            phones = [rng.choice(symbols) for _ in range(n)]
+            tones = [rng.randint(0, 5) for _ in range(n)]
+            expected = cleaned_text_to_sequence(phones, tones, language)
+            arrays = cleaned_text_to_arrays(phones, tones, language)
+            for array, values in zip(arrays, expected):
+                assert array.dtype == np.int64
+                assert array.tolist() == values
+
+
+def test_intersperse_array():
+    for n in (0, 1, 5, 64):
+        values = list(range(1, n + 1))
+        result = commons.intersperse_array(np.array(values, dtype=np.int64), 0)
+        assert result.dtype == np.int64
+        assert result.tolist() == commons.intersperse(values, 0)
+        # torch.from_numpy shares the memory instead of copying
+        assert torch.from_numpy(result).data_ptr() == result.ctypes.data
@@ -0,0 +1,92 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+import torch.nn as nn
+
+from melo.api import TTS
+
+
+class FrontendOnlyTTS(TTS):
+    """A TTS whose text frontend records its calls instead of running G2P and BERT"""
+
+    def __init__(self, fail_on=None, delay=0.0):
+        nn.Module.__init__(self)
+        self.language = 'EN'
+        self.fail_on = fail_on
+        self.delay = delay
+        self.prepared = []
+
+    def get_text_features(self, text):
+        time.sleep(self.delay)
+        if text == self.fail_on:
+            raise ValueError(f'frontend failed on {text}')
+        self.prepared.append(text)
+        return text.upper()
+
+    def get_text_features_batch(self, texts):
+        return [self.get_text_features(t) for t in texts]
+
+
+def frontend_threads():
+    return [t for t in threading.enumerate() if t.name == 'tts-frontend']
+
+
+def wait_for_frontend_threads(timeout=2.0):
+    deadline = time.monotonic() + timeout
+    while frontend_threads() and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return frontend_threads()
+
+
+TEXTS = [f's{i}' for i in range(10)]
+
+
+@pytest.mark.parametrize('prefetch', [0, 1, 3])
+@pytest.mark.parametrize('batch_size', [1, 4])
+def test_yields_every_text_in_order(prefetch, batch_size):
+    tts = FrontendOnlyTTS()
+    assert list(tts.iter_text_features(TEXTS, prefetch=prefetch, batch_size=batch_size)) == [t.upper() for t in TEXTS]
+    assert wait_for_frontend_threads() == []
+
+
+@pytest.mark.parametrize('prefetch', [0, 2])
+def test_frontend_error_reaches_the_consumer(prefetch):
+    tts = FrontendOnlyTTS(fail_on='s4')
+    features = tts.iter_text_features(TEXTS, prefetch=prefetch)
+    assert [next(features) for _ in range(4)] == ['S0', 'S1', 'S2', 'S3']
+    with pytest.raises(ValueError):
+        next(features)
+    assert wait_for_frontend_threads() == []
+
+
+def test_early_close_stops_the_worker():
+    tts = FrontendOnlyTTS(delay=0.01)
+    features = tts.iter_text_features(TEXTS * 10, prefetch=2)
+    next(features)
+    features.close()
+    assert wait_for_frontend_threads() == []
+    # The one consumed, the ones waiting in the queue and the one in progress
+    assert len(tts.prepared) <= 5
+
+
+def test_stream_closes_the_prefetch_when_inference_fails(monkeypatch):
+    tts = FrontendOnlyTTS(delay=0.01)
+    tts.hps = type('hps', (), {'data': type('data', (), {'sampling_rate': 1000})})
+    monkeypatch.setattr(tts, 'split_sentences_into_pieces', lambda *args: TEXTS * 10)
+
+    def failing_infer(features, *args, **kwargs):
+        raise RuntimeError('inference failed')
+
+    monkeypatch.setattr(tts, 'infer_features', failing_infer)
+    with pytest.raises(RuntimeError):
+        next(tts.tts_stream('text', 0, quiet=True))
+    assert wait_for_frontend_threads() == []
+
+    monkeypatch.setattr(tts, 'infer_features', lambda features, *args, **kwargs: [np.zeros(10, np.float32)] * len(features))
+    stream = tts.tts_stream('text', 0, quiet=True)
+    next(stream)
+    stream.close()
+    assert wait_for_frontend_threads() == []
+    assert len(tts.prepared) < len(TEXTS * 10)
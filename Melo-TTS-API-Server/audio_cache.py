@@ -0,0 +1,240 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+import threading
+from collections import OrderedDict
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+def make_cache_key(text, voice, speed, sdp_ratio, noise_scale, noise_scale_w, model_version,
+                   target_phones=None, first_target_phones=None):
+    """Content hash of everything that determines the synthesized audio"""
+    payload = json.dumps(
+        {
+            'text': text,
+            'voice': voice,
+            'speed': float(speed),
+            'sdp_ratio': float(sdp_ratio),
+            'noise_scale': float(noise_scale),
+            'noise_scale_w': float(noise_scale_w),
+            'model_version': model_version,
+            # How the text is packed into model inputs changes the audio
+            'target_phones': target_phones,
+            'first_target_phones': first_target_phones,
+        },
+        sort_keys=True,
+        ensure_ascii=False,
+    )
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class AudioCache:
+    """Two-tier cache of encoded audio keyed by `make_cache_key`.
+
+    The memory tier is an LRU bounded by `max_bytes`. When `disk_dir` is set,
+    every entry is also written there and misses in memory fall back to disk.
+    The disk tier is bounded by `disk_max_bytes` (0: no limit), evicting the
+    entries least recently written or read, by file mtime across restarts.
+    `get_or_create` de-duplicates concurrent misses for the same key so only
+    one caller synthesizes while the others wait for its result.
+    """
+
+    def __init__(self, max_bytes=256 * 1024 * 1024, disk_dir=None, disk_max_bytes=0):
+        self.max_bytes = max(0, int(max_bytes))
+        self.disk_dir = disk_dir
+        self.disk_max_bytes = max(0, int(disk_max_bytes))
+        self._entries = OrderedDict()
+        self._size = 0
+        # Entries on disk -> size in bytes, least recently used first
+        self._disk_entries = OrderedDict()
+        self._disk_size = 0
+        self._in_flight = {}
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.shared = 0
+        self.disk_evictions = 0
+        if disk_dir:
+            os.makedirs(disk_dir, exist_ok=True)
+            self._scan_disk()
+            with self._lock:
+                self._evict_disk()
+
+    def _scan_disk(self):
+        found = []
+        for root, _, files in os.walk(self.disk_dir):
+            for name in files:
+                if not name.endswith('.bin'):
+                    continue
+                try:
+                    st = os.stat(os.path.join(root, name))
+                except OSError:
+                    continue
+                found.append((st.st_mtime, name[:-len('.bin')], st.st_size))
+        for _, key, size in sorted(found):
+            self._disk_entries[key] = size
+            self._disk_size += size
+
+    def _disk_path(self, key):
+        return os.path.join(self.disk_dir, key[:2], f"{key}.bin")
+
+    def _read_disk(self, key):
+        if not self.disk_dir:
+            return None
+        path = self._disk_path(key)
+        try:
+            with open(path, 'rb') as f:
+                data = f.read()
+        except FileNotFoundError:
+            with self._lock:
+                self._forget_disk(key)
+            return None
+        except OSError as e:
+            logger.warning(f"Could not read cached audio {key}: {str(e)}")
+            return None
+        try:
+            # Keeps the eviction order across restarts
+            os.utime(path)
+        except OSError:
+            pass
+        with self._lock:
+            if key in self._disk_entries:
+                self._disk_entries.move_to_end(key)
+        return data
+
+    def _forget_disk(self, key):
+        # Caller holds self._lock
+        size = self._disk_entries.pop(key, None)
+        if size is not None:
+            self._disk_size -= size
+
+    def _evict_disk(self):
+        # Caller holds self._lock
+        while self.disk_max_bytes and self._disk_size > self.disk_max_bytes and self._disk_entries:
+            key, size = self._disk_entries.popitem(last=False)
+            self._disk_size -= size
+            self.disk_evictions += 1
+            try:
+                os.remove(self._disk_path(key))
+            except FileNotFoundError:
+                pass
+            except OSError as e:
+                logger.warning(f"Could not evict cached audio {key}: {str(e)}")
+
+    def _write_disk(self, key, data):
+        if not self.disk_dir:
+            return
+        path = self._disk_path(key)
+        tmp_path = None
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            # Write to a temp file first so readers never see a partial entry
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+            with os.fdopen(fd, 'wb') as f:
+                f.write(data)
+            os.replace(tmp_path, path)
+            tmp_path = None
+        except OSError as e:
+            logger.warning(f"Could not write cached audio {key}: {str(e)}")
+            return
+        finally:
+            # A failed write must not leave a file the disk budget doesn't count
+            if tmp_path is not None:
+                try:
+                    os.remove(tmp_path)
+                except OSError:
+                    pass
+        with self._lock:
+            self._forget_disk(key)
+            self._disk_entries[key] = len(data)
+            self._disk_size += len(data)
+            self._evict_disk()
+
+    def _put_memory(self, key, data):
+        # Caller holds self._lock
+        if len(data) > self.max_bytes:
+            return
+        if key in self._entries:
+            self._size -= len(self._entries.pop(key))
+        self._entries[key] = data
+        self._size += len(data)
+        while self._size > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self._size -= len(evicted)
+
+    def get(self, key):
+        with self._lock:
+            data = self._entries.get(key)
+            if data is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return data
+        data = self._read_disk(key)
+        if data is not None:
+            with self._lock:
+                self.disk_hits += 1
+                self._put_memory(key, data)
+        return data
+
+    def put(self, key, data):
+        with self._lock:
+            self._put_memory(key, data)
+        self._write_disk(key, data)
+
+    def get_or_create(self, key, create):
+        """Return cached bytes for `key`, calling `create()` at most once per key at a time"""
+        data = self.get(key)
+        if data is not None:
+            return data
+
+        with self._lock:
+            # Another caller may have finished between the lookup above and here
+            data = self._entries.get(key)
+            if data is not None:
+                self.hits += 1
+                return data
+            future = self._in_flight.get(key)
+            owner = future is None
+            if owner:
+                future = Future()
+                self._in_flight[key] = future
+                self.misses += 1
+            else:
+                self.shared += 1
+
+        if not owner:
+            return future.result()
+
+        try:
+            data = create()
+            self.put(key, data)
+            future.set_result(data)
+            return data
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        finally:
+            with self._lock:
+                self._in_flight.pop(key, None)
+
+    def stats(self):
+        with self._lock:
+            return {
+                'entries': len(self._entries),
+                'bytes': self._size,
+                'max_bytes': self.max_bytes,
+                'disk_dir': self.disk_dir,
+                'disk_entries': len(self._disk_entries),
+                'disk_bytes': self._disk_size,
+                'disk_max_bytes': self.disk_max_bytes,
+                'disk_evictions': self.disk_evictions,
+                'hits': self.hits,
+                'disk_hits': self.disk_hits,
+                'misses': self.misses,
+                'shared_in_flight': self.shared,
+            }
@@ -0,0 +1,344 @@
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+
+class SchedulerStopped(RuntimeError):
+    """Raised when submitting to a scheduler that has been stopped"""
+
+
+class _Sentence:
+    """One sentence of a synthesis request, the unit that gets batched"""
+
+    def __init__(self, job, index, text, seed=None):
+        self.job = job
+        self.index = index
+        self.text = text
+        self.seed = seed
+        self.enqueued_at = time.monotonic()
+
+    @property
+    def batch_key(self):
+        # SynthesizerTrn.infer takes these as scalars, so only sentences that
+        # agree on them can share a forward pass. Speakers may differ per item.
+        return self.job.batch_key
+
+
+class _Job:
+    """A single synthesis request, resolved once all of its sentences are done"""
+
+    def __init__(self, text, speaker_id, speed, sdp_ratio, noise_scale, noise_scale_w, seed=None, stream=False):
+        self.text = text
+        self.speaker_id = speaker_id
+        self.speed = speed
+        self.sdp_ratio = sdp_ratio
+        self.noise_scale = noise_scale
+        self.noise_scale_w = noise_scale_w
+        self.seed = seed
+        self.batch_key = (speed, sdp_ratio, noise_scale, noise_scale_w)
+        self.future = Future()
+        self.submitted_at = time.monotonic()
+        self.results = []
+        self.remaining = 0
+        self.lock = threading.Lock()
+        # Streamed jobs hand each sentence over as (index, audio) instead of keeping it
+        self.stream = queue.Queue() if stream else None
+
+    def set_sentence_result(self, index, audio):
+        """Store one sentence's audio, returning True when it was the last one"""
+        with self.lock:
+            if self.future.done():
+                return False
+            if self.stream is None:
+                self.results[index] = audio
+            else:
+                self.stream.put((index, audio))
+            self.remaining -= 1
+            if self.remaining:
+                return False
+            if self.stream is not None:
+                # Resolved before the consumer can read the last sentence and close the stream
+                self.future.set_result(None)
+            return True
+
+    def set_result(self, audio):
+        with self.lock:
+            if self.future.done():
+                return False
+            self.future.set_result(audio)
+            return True
+
+    def set_exception(self, exc):
+        with self.lock:
+            if self.future.done():
+                return
+            self.future.set_exception(exc)
+            if self.stream is not None:
+                self.stream.put((None, exc))
+
+
+class SchedulerMetrics:
+    """Running counters for batch throughput and request latency"""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started_at = time.monotonic()
+        self.requests = 0
+        self.failed_requests = 0
+        self.sentences = 0
+        self.batches = 0
+        self.busy_time = 0.0
+        self.queue_wait_total = 0.0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+
+    def record_batch(self, size, queue_waits, duration):
+        with self.lock:
+            self.batches += 1
+            self.sentences += size
+            self.busy_time += duration
+            self.queue_wait_total += sum(queue_waits)
+
+    def record_request(self, latency, failed=False):
+        with self.lock:
+            self.requests += 1
+            if failed:
+                self.failed_requests += 1
+            self.latency_total += latency
+            self.latency_max = max(self.latency_max, latency)
+
+    def snapshot(self):
+        with self.lock:
+            uptime = time.monotonic() - self.started_at
+            return {
+                'requests': self.requests,
+                'failed_requests': self.failed_requests,
+                'sentences': self.sentences,
+                'batches': self.batches,
+                'avg_batch_size': self.sentences / self.batches if self.batches else 0.0,
+                'avg_queue_wait_ms': 1000 * self.queue_wait_total / self.sentences if self.sentences else 0.0,
+                'avg_request_latency_ms': 1000 * self.latency_total / self.requests if self.requests else 0.0,
+                'max_request_latency_ms': 1000 * self.latency_max,
+                'model_busy_ratio': self.busy_time / uptime if uptime else 0.0,
+                'sentences_per_busy_second': self.sentences / self.busy_time if self.busy_time else 0.0,
+                'uptime_s': uptime,
+            }
+
+
+class InferenceScheduler:
+    """Serializes all synthesis for one TTS model and batches it dynamically.
+
+    Requests are split into sentences and queued. A single worker thread takes
+    the oldest sentence, then waits up to `max_wait` seconds for more sentences
+    with the same speed / noise settings, up to `max_batch`, and synthesizes
+    them with one `TTS.infer_features` call. `submit` returns a Future that
+    resolves to the request's concatenated float32 audio, `submit_stream` an
+    iterator over the audio of each sentence in order. With `target_phones`
+    the sentences are packed into pieces of about that many phones, so the
+    sentences of a batch need little padding, and `first_target_phones` makes
+    the first piece smaller. Both apply to every request, so a request and its
+    seed give the same audio whether it is streamed or not.
+    """
+
+    def __init__(self, tts, max_batch=8, max_wait=0.02, name=None, target_phones=None, first_target_phones=None):
+        self.tts = tts
+        self.target_phones = target_phones
+        self.first_target_phones = first_target_phones
+        self.max_batch = max(1, int(max_batch))
+        self.max_wait = max(0.0, float(max_wait))
+        self.metrics = SchedulerMetrics()
+        self._queue = queue.Queue()
+        # Sentences taken off the queue that did not fit the last batch
+        self._deferred = []
+        self._stopped = threading.Event()
+        # Makes stopping atomic with queuing, so no sentence lands behind the shutdown marker
+        self._submit_lock = threading.Lock()
+        self._thread = threading.Thread(
+            target=self._run, name=name or f"tts-scheduler-{tts.language}", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, text, speaker_id=0, speed=1.0, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, seed=None):
+        job = _Job(text, speaker_id, speed, sdp_ratio, noise_scale, noise_scale_w, seed=seed)
+        self._enqueue(job)
+        return job.future
+
+    def submit_stream(self, text, speaker_id=0, speed=1.0, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, seed=None):
+        """Like `submit`, but return an iterator yielding each sentence's float32 audio, followed by
+        its inter-sentence silence, as soon as it and the sentences before it are synthesized.
+
+        The sentences are batched with those of other requests like any other.
+        Closing the iterator early drops the sentences not synthesized yet.
+        """
+        job = _Job(text, speaker_id, speed, sdp_ratio, noise_scale, noise_scale_w, seed=seed, stream=True)
+        self._enqueue(job)
+        return self._iter_stream(job)
+
+    def _enqueue(self, job):
+        if self._stopped.is_set():
+            raise SchedulerStopped("Scheduler has been stopped")
+        texts = self.tts.split_sentences_into_pieces(
+            job.text, self.tts.language, quiet=True,
+            target_phones=self.target_phones, first_target_phones=self.first_target_phones
+        )
+        if not texts:
+            job.set_exception(ValueError("No text to synthesize"))
+            return
+        job.results = [None] * len(texts)
+        job.remaining = len(texts)
+        seeds = self.tts.sentence_seeds(job.seed, len(texts)) or [None] * len(texts)
+        with self._submit_lock:
+            if self._stopped.is_set():
+                raise SchedulerStopped("Scheduler has been stopped")
+            for index, t in enumerate(texts):
+                self._queue.put(_Sentence(job, index, t, seed=seeds[index]))
+
+    def _iter_stream(self, job):
+        sr = self.tts.hps.data.sampling_rate
+        # Sentences of one request can finish out of order when they land in different batches
+        finished = {}
+        next_index = 0
+        try:
+            while next_index < len(job.results):
+                index, audio = job.stream.get()
+                if index is None:
+                    raise audio
+                finished[index] = audio
+                while next_index in finished:
+                    yield self.tts.audio_numpy_concat([finished.pop(next_index)], sr=sr, speed=job.speed)
+                    next_index += 1
+            if not job.results:
+                job.future.result()
+        finally:
+            # Closed before its last sentence: the worker skips the sentences of a job that is done
+            if not job.future.done():
+                job.set_exception(RuntimeError("Stream closed"))
+
+    def stop(self, timeout=None):
+        """Stop accepting requests and let the worker finish what is queued"""
+        with self._submit_lock:
+            self._stopped.set()
+            self._queue.put(None)
+        self._thread.join(timeout)
+
+    def _next_sentence(self, timeout=None):
+        if self._deferred:
+            return self._deferred.pop(0)
+        try:
+            return self._queue.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def _collect_batch(self, first):
+        batch = [first]
+        deadline = time.monotonic() + self.max_wait
+        # Deferred sentences are already waiting, so consider them before new ones
+        deferred, self._deferred = self._deferred, []
+        for item in deferred:
+            if len(batch) < self.max_batch and item.batch_key == first.batch_key:
+                batch.append(item)
+            else:
+                self._deferred.append(item)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                break
+            try:
+                item = self._queue.get(timeout=remaining)
+            except queue.Empty:
+                break
+            if item is None:
+                # Keep the shutdown marker for the main loop
+                self._queue.put(None)
+                break
+            if item.batch_key == first.batch_key:
+                batch.append(item)
+            else:
+                self._deferred.append(item)
+        return batch
+
+    def _run(self):
+        while True:
+            first = self._next_sentence()
+            if first is None:
+                if self._stopped.is_set():
+                    if not self._deferred and self._queue.empty():
+                        return
+                    # Work arrived alongside the shutdown marker; drain it first
+                    self._queue.put(None)
+                continue
+            batch = self._collect_batch(first)
+            try:
+                self._run_batch(batch)
+            except Exception as e:
+                # Fail this batch's requests rather than the worker, which every later request needs
+                logger.error(f"Scheduler batch failed: {str(e)}", exc_info=True)
+                for item in batch:
+                    self._fail(item.job, e)
+
+    def _run_batch(self, batch):
+        started = time.monotonic()
+        queue_waits = [started - item.enqueued_at for item in batch]
+
+        features, ready = self._text_features([item for item in batch if not item.job.future.done()])
+
+        if ready:
+            job = ready[0].job
+            try:
+                audios = self.tts.infer_features(
+                    features,
+                    [item.job.speaker_id for item in ready],
+                    sdp_ratio=job.sdp_ratio,
+                    noise_scale=job.noise_scale,
+                    noise_scale_w=job.noise_scale_w,
+                    speed=job.speed,
+                    seed=[item.seed for item in ready],
+                )
+            except Exception as e:
+                logger.error(f"Batched inference failed: {str(e)}", exc_info=True)
+                for item in ready:
+                    self._fail(item.job, e)
+            else:
+                for item, audio in zip(ready, audios):
+                    if item.job.set_sentence_result(item.index, audio):
+                        self._finish(item.job)
+
+        self.metrics.record_batch(len(batch), queue_waits, time.monotonic() - started)
+
+    def _text_features(self, items):
+        """Run the text frontend for a batch, isolating sentences that fail"""
+        if len(items) > 1:
+            try:
+                return self.tts.get_text_features_batch([item.text for item in items]), items
+            except Exception as e:
+                # Fall back to one sentence at a time to find the failing one
+                logger.warning(f"Batched text frontend failed, retrying per sentence: {str(e)}")
+        features, ready = [], []
+        for item in items:
+            try:
+                features.append(self.tts.get_text_features(item.text))
+                ready.append(item)
+            except Exception as e:
+                logger.error(f"Text frontend failed for sentence {item.text!r}: {str(e)}", exc_info=True)
+                self._fail(item.job, e)
+        return features, ready
+
+    def _finish(self, job):
+        if job.stream is None:
+            sr = self.tts.hps.data.sampling_rate
+            audio = self.tts.audio_numpy_concat(job.results, sr=sr, speed=job.speed)
+            job.results = None
+            # The caller may have cancelled the future in the meantime
+            if not job.set_result(audio):
+                return
+        # Streamed jobs are resolved with their last sentence
+        self.metrics.record_request(time.monotonic() - job.submitted_at)
+
+    def _fail(self, job, exc):
+        if not job.future.done():
+            job.set_exception(exc)
+            self.metrics.record_request(time.monotonic() - job.submitted_at, failed=True)
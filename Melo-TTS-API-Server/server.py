@@ -1,4 +1,4 @@
-from flask import Flask, request, send_file, jsonify, send_from_directory
+from flask import Flask, request, send_file, jsonify, send_from_directory, Response, stream_with_context
 from flask_cors import CORS
 from flask_limiter import Limiter
 from flask_limiter.util import get_remote_address
@@ -9,13 +9,19 @@ from marshmallow import Schema, fields
 from apispec import APISpec
 from apispec.ext.marshmallow import MarshmallowPlugin
 from melo.api import TTS
+from melo.text import bert_models
+from scheduler import InferenceScheduler, SchedulerStopped
+from audio_cache import AudioCache, make_cache_key
+import numpy as np
+import soundfile
 import io
+import struct
 import threading
-import tempfile
 import os
 import logging
 import sys
 import datetime
+from collections import OrderedDict
 from functools import wraps
 
 # Configure logging
@@ -66,18 +72,18 @@ def verify_token(token):
         return API_KEYS[token]
     return None
 
-# Define available voices
+# Define available voices: the model (language code) and its speaker
 AVAILABLE_VOICES = {
-    'EN-US': {'name': 'English (American)', 'code': 'EN'},
-    'EN-BR': {'name': 'English (British)', 'code': 'EN'},
-    'EN-IN': {'name': 'English (Indian)', 'code': 'EN'},
-    'EN-AU': {'name': 'English (Australian)', 'code': 'EN'},
-    'EN': {'name': 'English (Default)', 'code': 'EN'},
-    'ES': {'name': 'Spanish', 'code': 'ES'},
-    'FR': {'name': 'French', 'code': 'FR'},
-    'ZH': {'name': 'Chinese', 'code': 'ZH'},
-    'JP': {'name': 'Japanese', 'code': 'JP'},
-    'KR': {'name': 'Korean', 'code': 'KR'}
+    'EN-US': {'name': 'English (American)', 'code': 'EN', 'speaker': 'EN-US'},
+    'EN-BR': {'name': 'English (British)', 'code': 'EN', 'speaker': 'EN-BR'},
+    'EN-IN': {'name': 'English (Indian)', 'code': 'EN', 'speaker': 'EN_INDIA'},
+    'EN-AU': {'name': 'English (Australian)', 'code': 'EN', 'speaker': 'EN-AU'},
+    'EN': {'name': 'English (Default)', 'code': 'EN', 'speaker': 'EN-Default'},
+    'ES': {'name': 'Spanish', 'code': 'ES', 'speaker': 'ES'},
+    'FR': {'name': 'French', 'code': 'FR', 'speaker': 'FR'},
+    'ZH': {'name': 'Chinese', 'code': 'ZH', 'speaker': 'ZH'},
+    'JP': {'name': 'Japanese', 'code': 'JP', 'speaker': 'JP'},
+    'KR': {'name': 'Korean', 'code': 'KR', 'speaker': 'KR'}
 }
 
 # Schemas for request/response validation and documentation
@@ -95,31 +101,206 @@ class SynthesisRequestSchema(Schema):
     voice = fields.Str(required=False, default="EN", description="Voice ID to use")
     speed = fields.Float(required=False, default=1.0, description="Speech speed multiplier")
 
+class StreamSynthesisRequestSchema(SynthesisRequestSchema):
+    format = fields.Str(required=False, default="wav", description="Stream format: 'wav' or 'pcm' (raw 16-bit big-endian mono, audio/L16)")
+
 class ErrorResponseSchema(Schema):
     success = fields.Bool(required=True)
     timestamp = fields.DateTime(required=True)
     error = fields.Str(required=True)
 
-# Current TTS instance
-current_tts = None
-current_voice = None
-
-def get_tts(voice_id):
-    """Get or create TTS instance for the specified voice"""
-    global current_tts, current_voice
-    
-    if voice_id != current_voice:
-        logger.info(f"Initializing new TTS model for voice: {voice_id}")
-        os.environ["MECAB_SKIP"] = "1"  # Skip MeCab initialization
-        
-        voice_info = AVAILABLE_VOICES.get(voice_id)
-        if not voice_info:
-            raise ValueError(f"Invalid voice ID: {voice_id}")
-            
-        current_tts = TTS(language=voice_info['code'])
-        current_voice = voice_id
-        
-    return current_tts
+# Content type and sample encoding of each chunked synthesis stream format. WAV
+# samples are little-endian, audio/L16 is in network byte order (RFC 2586).
+STREAM_FORMATS = {
+    'wav': ('audio/wav', '<i2'),
+    'pcm': ('audio/L16', '>i2'),
+}
+
+# Cross-request batching: sentences from concurrent requests are synthesized together
+SCHEDULER_MAX_BATCH = int(os.environ.get('TTS_MAX_BATCH', '8'))
+SCHEDULER_MAX_WAIT = float(os.environ.get('TTS_MAX_WAIT_MS', '20')) / 1000.0
+# How many language models stay loaded, the least recently used is unloaded past it (0: no limit)
+MAX_LOADED_MODELS = int(os.environ.get('TTS_MAX_LOADED_MODELS', '0'))
+
+# Length-aware splitting: text is packed into pieces of about this many phones
+# (unset: one piece per sentence). The first streamed piece can be smaller so
+# its audio is ready sooner.
+def positive_int_env(name):
+    """Integer environment variable that must be positive when set, None when unset"""
+    value = os.environ.get(name)
+    if not value:
+        return None
+    number = int(value)
+    if number <= 0:
+        raise ValueError(f"{name} must be a positive number of phones, got {value}")
+    return number
+
+TARGET_PHONES = positive_int_env('TTS_TARGET_PHONES')
+FIRST_TARGET_PHONES = positive_int_env('TTS_FIRST_TARGET_PHONES')
+
+# Sampling parameters passed to every synthesis; part of the audio cache key
+SYNTHESIS_PARAMS = {
+    'sdp_ratio': 0.2,
+    'noise_scale': 0.6,
+    'noise_scale_w': 0.8,
+}
+
+# Synthesized audio cache. Bump TTS_MODEL_VERSION when checkpoints change so
+# stale entries (and browser ETags) are no longer matched.
+MODEL_VERSION = os.environ.get('TTS_MODEL_VERSION', '1')
+CACHE_MAX_AGE = int(os.environ.get('TTS_CACHE_MAX_AGE', '86400'))
+audio_cache = AudioCache(
+    max_bytes=int(float(os.environ.get('TTS_CACHE_MAX_MB', '256')) * 1024 * 1024),
+    disk_dir=os.environ.get('TTS_CACHE_DIR') or None,
+    disk_max_bytes=int(float(os.environ.get('TTS_CACHE_DISK_MAX_MB', '1024')) * 1024 * 1024)
+)
+
+# BERT encoders used by the text frontend. TTS_BERT_DEVICE pins them to one
+# device (default: the TTS model's), TTS_BERT_DTYPE is fp32, bf16 or int8 (CPU
+# only) and the limits bound how many stay loaded when voices are switched.
+bert_models.configure(
+    device=os.environ.get('TTS_BERT_DEVICE') or None,
+    dtype=os.environ.get('TTS_BERT_DTYPE', 'fp32'),
+    max_models=int(os.environ.get('TTS_BERT_MAX_MODELS', '0')),
+    max_bytes=int(float(os.environ.get('TTS_BERT_MAX_MB', '0')) * 1024 * 1024)
+)
+
+# One TTS model and inference scheduler per model code, least recently used first.
+# Voices of the same language share the model and differ by speaker id.
+schedulers = OrderedDict()
+tts_lock = threading.RLock()
+
+def get_voice_info(voice_id):
+    voice_info = AVAILABLE_VOICES.get(voice_id)
+    if not voice_info:
+        raise ValueError(f"Invalid voice ID: {voice_id}")
+    return voice_info
+
+def get_scheduler(voice_id):
+    """Get the inference scheduler of the model for the specified voice, loading it when needed"""
+    code = get_voice_info(voice_id)['code']
+    unloaded = []
+    with tts_lock:
+        scheduler = schedulers.get(code)
+        if scheduler is None:
+            logger.info(f"Initializing new TTS model for voice: {voice_id}")
+            os.environ["MECAB_SKIP"] = "1"  # Skip MeCab initialization
+            tts = TTS(language=code)
+            # Load the BERT encoder now rather than on the first request
+            bert_models.warmup([tts.language], device=tts.device)
+            scheduler = InferenceScheduler(
+                tts,
+                max_batch=SCHEDULER_MAX_BATCH,
+                max_wait=SCHEDULER_MAX_WAIT,
+                target_phones=TARGET_PHONES,
+                first_target_phones=FIRST_TARGET_PHONES
+            )
+            schedulers[code] = scheduler
+            while MAX_LOADED_MODELS > 0 and len(schedulers) > MAX_LOADED_MODELS:
+                unloaded.append(schedulers.popitem(last=False)[1])
+        schedulers.move_to_end(code)
+    for old in unloaded:
+        # Its queued requests are synthesized before the model is dropped
+        logger.info(f"Unloading TTS model: {old.tts.language}")
+        old.stop()
+    return scheduler
+
+def get_speaker_id(scheduler, voice_id):
+    """Speaker id of a voice in its model"""
+    speaker = get_voice_info(voice_id)['speaker']
+    spk2id = scheduler.tts.hps.data.spk2id
+    if speaker in spk2id:
+        return spk2id[speaker]
+    logger.warning(f"Speaker {speaker} not in the model, using its first speaker")
+    return next(iter(spk2id.values()))
+
+def submit_synthesis(voice_id, submit):
+    """Call submit(scheduler, speaker_id) on the voice's scheduler.
+
+    Retried when the model was unloaded between looking up its scheduler and
+    submitting, which reloads it.
+    """
+    for _ in range(3):
+        scheduler = get_scheduler(voice_id)
+        try:
+            return scheduler, submit(scheduler, get_speaker_id(scheduler, voice_id))
+        except SchedulerStopped:
+            continue
+    raise RuntimeError(f"Model for voice {voice_id} was unloaded while submitting")
+
+def seed_from_key(key):
+    """Derive the synthesis seed from the cache key so identical requests give identical audio.
+
+    The decoder masks batch padding, so the other requests a sentence is batched
+    with change its audio only by float rounding, at most the last bit of a sample.
+    """
+    return int(key[:15], 16)
+
+def get_cache_key(text, voice_id, speed):
+    voice_info = get_voice_info(voice_id)
+    return make_cache_key(
+        text, voice_id, speed,
+        model_version=f"{voice_info['code']}:{MODEL_VERSION}",
+        target_phones=TARGET_PHONES,
+        first_target_phones=FIRST_TARGET_PHONES,
+        **SYNTHESIS_PARAMS
+    )
+
+def synthesize_wav(text, voice_id, speed, seed=None):
+    """Synthesize text through the batching scheduler and return a WAV buffer"""
+    scheduler, future = submit_synthesis(
+        voice_id,
+        lambda scheduler, speaker_id: scheduler.submit(text, speaker_id=speaker_id, speed=speed, seed=seed, **SYNTHESIS_PARAMS)
+    )
+    audio = future.result()
+    buffer = io.BytesIO()
+    soundfile.write(buffer, audio, scheduler.tts.hps.data.sampling_rate, format='WAV')
+    buffer.seek(0)
+    return buffer
+
+def synthesize_cached(key, text, voice_id, speed):
+    """Return the WAV bytes for `key`, synthesizing only when the audio is not cached"""
+    def create():
+        data = synthesize_wav(text, voice_id, speed, seed=seed_from_key(key)).getvalue()
+        if not data:
+            raise Exception("Failed to generate audio file")
+        return data
+
+    return audio_cache.get_or_create(key, create)
+
+def send_audio(key, data, private=False):
+    """Send cached WAV bytes with an ETag so clients can revalidate instead of re-downloading"""
+    response = send_file(
+        io.BytesIO(data),
+        mimetype='audio/wav',
+        as_attachment=True,
+        download_name='speech.wav',
+        etag=key,
+        max_age=CACHE_MAX_AGE
+    )
+    if private:
+        # Authenticated responses must not be stored by shared caches
+        response.cache_control.public = False
+        response.cache_control.private = True
+    return response
+
+def send_synthesized_audio(text, voice_id, speed, private=False):
+    """Respond with the audio for a request, or 304 when the client already has it.
+
+    The key is the ETag, so a revalidation is answered without touching the
+    cache or the model, even when the audio is no longer cached here.
+    """
+    key = get_cache_key(text, voice_id, speed)
+    if request.if_none_match.contains(key):
+        response = Response(status=304)
+        response.set_etag(key)
+        response.cache_control.max_age = CACHE_MAX_AGE
+        if private:
+            response.cache_control.private = True
+        else:
+            response.cache_control.public = True
+        return response
+    return send_audio(key, synthesize_cached(key, text, voice_id, speed), private=private)
 
 def api_response(success, data=None, error=None, status_code=200):
     """Helper function to structure API responses"""
@@ -133,6 +314,22 @@ def api_response(success, data=None, error=None, status_code=200):
         response['error'] = error
     return jsonify(response), status_code
 
+def wav_stream_header(sample_rate, channels=1, bits_per_sample=16):
+    """Build a WAV header for a stream whose total length is not known yet"""
+    block_align = channels * bits_per_sample // 8
+    # 0xFFFFFFFF in the RIFF and data sizes is the conventional "unknown length"
+    # marker understood by browsers, ffmpeg and most players.
+    return struct.pack(
+        '<4sI4s4sIHHIIHH4sI',
+        b'RIFF', 0xFFFFFFFF, b'WAVE',
+        b'fmt ', 16, 1, channels, sample_rate, sample_rate * block_align, block_align, bits_per_sample,
+        b'data', 0xFFFFFFFF
+    )
+
+def float_to_pcm16(audio, dtype='<i2'):
+    """Convert float audio in [-1, 1] to 16-bit PCM bytes, little-endian unless `dtype` is '>i2'"""
+    return (np.clip(audio, -1.0, 1.0) * 32767).astype(dtype).tobytes()
+
 # Frontend routes
 @app.route('/')
 def root():
@@ -171,40 +368,89 @@ def api_synthesize(**kwargs):
 
         logger.info(f"API synthesis request - Text: {text}, Speed: {speed}, Voice: {voice_id}")
 
-        temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_path = temp_file.name
-        temp_file.close()
+        return send_synthesized_audio(text, voice_id, speed, private=True)
 
-        try:
-            tts = get_tts(voice_id)
-            tts.tts_to_file(
-                text=text,
-                speaker_id=0,
-                output_path=temp_path,
-                speed=speed
-            )
-            
-            if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
-                raise Exception("Failed to generate audio file")
-                
-            response = send_file(
-                temp_path,
-                mimetype='audio/wav',
-                as_attachment=True,
-                download_name='speech.wav'
+    except Exception as e:
+        logger.error(f"Error in synthesis: {str(e)}", exc_info=True)
+        return api_response(False, error=str(e), status_code=500)
+
+@app.route('/api/v1/synthesize/stream', methods=['POST'])
+@auth.login_required
+@limiter.limit("20/minute")
+@doc(description='Convert text to speech, streaming audio sentence by sentence', tags=['synthesis'])
+@use_kwargs(StreamSynthesisRequestSchema)
+def api_synthesize_stream(**kwargs):
+    """API endpoint for chunked text-to-speech synthesis"""
+    try:
+        text = kwargs.get('text')
+        speed = float(kwargs.get('speed', 1.0))
+        voice_id = kwargs.get('voice', 'EN')
+        stream_format = kwargs.get('format', 'wav').lower()
+
+        logger.info(f"API stream synthesis request - Text: {text}, Speed: {speed}, Voice: {voice_id}, Format: {stream_format}")
+
+        if stream_format not in STREAM_FORMATS:
+            return api_response(False, error=f"Invalid stream format: {stream_format}", status_code=400)
+
+        # Queue the request before streaming starts so errors still get a JSON response.
+        # It goes through the scheduler like any other, which serializes use of the model.
+        seed = seed_from_key(get_cache_key(text, voice_id, speed))
+        scheduler, pieces = submit_synthesis(
+            voice_id,
+            lambda scheduler, speaker_id: scheduler.submit_stream(
+                text, speaker_id=speaker_id, speed=speed, seed=seed, **SYNTHESIS_PARAMS
             )
-            response.headers['Content-Length'] = os.path.getsize(temp_path)
-            return response
+        )
+        sample_rate = scheduler.tts.hps.data.sampling_rate
+        mimetype, sample_dtype = STREAM_FORMATS[stream_format]
+
+        def generate():
+            if stream_format == 'wav':
+                yield wav_stream_header(sample_rate)
+            try:
+                for audio in pieces:
+                    yield float_to_pcm16(audio, sample_dtype)
+            except Exception as e:
+                # Headers are already sent, so all we can do is end the stream early
+                logger.error(f"Error in stream synthesis: {str(e)}", exc_info=True)
+            finally:
+                # Drop the sentences not synthesized yet when the client goes away
+                pieces.close()
+
+        if stream_format == 'pcm':
+            # Raw PCM has no header, so the content type carries the format
+            mimetype = f"{mimetype};rate={sample_rate};channels=1"
+        response = Response(stream_with_context(generate()), mimetype=mimetype)
+        response.headers['X-Sample-Rate'] = str(sample_rate)
+        response.headers['Cache-Control'] = 'no-cache'
+        return response
 
-        finally:
-            if os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception as e:
-                    logger.error(f"Error cleaning up temp file: {str(e)}", exc_info=True)
+    except Exception as e:
+        logger.error(f"Error in stream synthesis: {str(e)}", exc_info=True)
+        return api_response(False, error=str(e), status_code=500)
 
+@app.route('/api/v1/metrics', methods=['GET'])
+@auth.login_required
+@limiter.limit("30/minute")
+@doc(description='Get batching scheduler, audio cache and BERT model metrics', tags=['monitoring'])
+def api_metrics():
+    """API endpoint for inference scheduler, audio cache and BERT model metrics"""
+    try:
+        with tts_lock:
+            loaded = list(schedulers.items())
+        data = {
+            'max_batch': SCHEDULER_MAX_BATCH,
+            'max_wait_ms': SCHEDULER_MAX_WAIT * 1000.0,
+            'max_loaded_models': MAX_LOADED_MODELS,
+            'target_phones': TARGET_PHONES,
+            'first_target_phones': FIRST_TARGET_PHONES,
+            'schedulers': {code: scheduler.metrics.snapshot() for code, scheduler in loaded},
+            'cache': audio_cache.stats(),
+            'bert': bert_models.stats(),
+        }
+        return api_response(True, data)
     except Exception as e:
-        logger.error(f"Error in synthesis: {str(e)}", exc_info=True)
+        logger.error(f"Error in metrics: {str(e)}", exc_info=True)
         return api_response(False, error=str(e), status_code=500)
 
 # Legacy routes for frontend compatibility
@@ -221,11 +467,13 @@ def list_voices():
         logger.error(f"Error in list_voices: {str(e)}", exc_info=True)
         return jsonify({'error': str(e)}), 500
 
-@app.route('/synthesize', methods=['POST'])
+@app.route('/synthesize', methods=['GET', 'POST'])
 def synthesize():
     """Legacy endpoint for frontend"""
     try:
-        data = request.json
+        # GET lets pages use the URL directly as an <audio> source, which the
+        # browser cache can reuse and revalidate via the ETag
+        data = request.args if request.method == 'GET' else request.json
         if not data or 'text' not in data:
             return jsonify({'error': 'No text provided'}), 400
 
@@ -235,37 +483,7 @@ def synthesize():
         
         logger.info(f"Frontend synthesis request - Text: {text}, Speed: {speed}, Voice: {voice_id}")
 
-        temp_file = tempfile.NamedTemporaryFile(suffix='.wav', delete=False)
-        temp_path = temp_file.name
-        temp_file.close()
-
-        try:
-            tts = get_tts(voice_id)
-            tts.tts_to_file(
-                text=text,
-                speaker_id=0,
-                output_path=temp_path,
-                speed=speed
-            )
-            
-            if not os.path.exists(temp_path) or os.path.getsize(temp_path) == 0:
-                raise Exception("Failed to generate audio file")
-                
-            response = send_file(
-                temp_path,
-                mimetype='audio/wav',
-                as_attachment=True,
-                download_name='speech.wav'
-            )
-            response.headers['Content-Length'] = os.path.getsize(temp_path)
-            return response
-
-        finally:
-            if os.path.exists(temp_path):
-                try:
-                    os.unlink(temp_path)
-                except Exception as e:
-                    logger.error(f"Error cleaning up temp file: {str(e)}", exc_info=True)
+        return send_synthesized_audio(text, voice_id, speed)
 
     except Exception as e:
         logger.error(f"Error in synthesis: {str(e)}", exc_info=True)
@@ -274,6 +492,8 @@ def synthesize():
 # Register API documentation
 docs.register(api_list_voices)
 docs.register(api_synthesize)
+docs.register(api_synthesize_stream)
+docs.register(api_metrics)
 
 if __name__ == '__main__':
     logger.info("Starting MeloTTS API server...")
@@ -0,0 +1,120 @@
+import os
+import threading
+import time
+
+import pytest
+
+from audio_cache import AudioCache, make_cache_key
+
+KEY_ARGS = {
+    'text': 'Hello', 'voice': 'EN-US', 'speed': 1.0, 'sdp_ratio': 0.2, 'noise_scale': 0.6,
+    'noise_scale_w': 0.8, 'model_version': 'EN:1', 'target_phones': None, 'first_target_phones': None,
+}
+
+
+def disk_files(path):
+    return sorted(name for _, _, files in os.walk(path) for name in files)
+
+
+def test_key_covers_every_input():
+    key = make_cache_key(**KEY_ARGS)
+    assert key == make_cache_key(**KEY_ARGS)
+    changed = {
+        'text': 'Hello!', 'voice': 'EN-BR', 'speed': 1.5, 'sdp_ratio': 0.3, 'noise_scale': 0.5,
+        'noise_scale_w': 0.7, 'model_version': 'EN:2', 'target_phones': 120, 'first_target_phones': 30,
+    }
+    for name, value in changed.items():
+        assert make_cache_key(**dict(KEY_ARGS, **{name: value})) != key, name
+
+
+def test_memory_evicts_least_recently_used_by_bytes():
+    cache = AudioCache(max_bytes=250)
+    for key in ('a', 'b'):
+        cache.put(key, b'x' * 100)
+    assert cache.get('a') is not None
+    cache.put('c', b'x' * 100)
+    assert cache.get('b') is None
+    assert cache.get('a') is not None and cache.get('c') is not None
+    # Entries larger than the whole budget are not kept at all
+    cache.put('big', b'x' * 300)
+    assert cache.get('big') is None
+    assert cache.stats()['bytes'] == 200
+
+
+def test_concurrent_misses_create_once():
+    cache = AudioCache(max_bytes=1024)
+    calls = []
+    release = threading.Event()
+
+    def create():
+        calls.append(1)
+        release.wait(5)
+        return b'audio'
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get_or_create('k', create))) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    # Release the creator only once every caller has missed
+    deadline = time.monotonic() + 5
+    while cache.stats()['shared_in_flight'] + cache.stats()['misses'] < 8 and time.monotonic() < deadline:
+        time.sleep(0.001)
+    release.set()
+    for thread in threads:
+        thread.join(5)
+    assert results == [b'audio'] * 8
+    assert len(calls) == 1
+    assert cache.stats()['misses'] == 1 and cache.stats()['shared_in_flight'] == 7
+
+
+def test_failed_create_is_not_cached():
+    cache = AudioCache(max_bytes=1024)
+
+    def fail():
+        raise RuntimeError('synthesis failed')
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create('k', fail)
+    assert cache.get_or_create('k', lambda: b'audio') == b'audio'
+
+
+def test_disk_entries_survive_restart(tmp_path):
+    cache = AudioCache(max_bytes=0, disk_dir=str(tmp_path))
+    cache.put('abcdef', b'audio')
+    restarted = AudioCache(max_bytes=0, disk_dir=str(tmp_path))
+    assert restarted.get('abcdef') == b'audio'
+    assert restarted.stats()['disk_hits'] == 1 and restarted.stats()['disk_bytes'] == 5
+
+
+def test_disk_budget_evicts_least_recently_used(tmp_path):
+    cache = AudioCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=250)
+    for key in ('aa01', 'aa02'):
+        cache.put(key, b'x' * 100)
+    assert cache.get('aa01') is not None
+    cache.put('aa03', b'x' * 100)
+    assert cache.get('aa02') is None
+    assert cache.get('aa01') is not None and cache.get('aa03') is not None
+    assert disk_files(tmp_path) == ['aa01.bin', 'aa03.bin']
+    assert cache.stats()['disk_bytes'] == 200 and cache.stats()['disk_evictions'] == 1
+
+
+def test_disk_budget_applies_to_existing_files(tmp_path):
+    cache = AudioCache(max_bytes=0, disk_dir=str(tmp_path))
+    for i, key in enumerate(('bb01', 'bb02', 'bb03')):
+        cache.put(key, b'x' * 100)
+        os.utime(cache._disk_path(key), (1000 + i, 1000 + i))
+    restarted = AudioCache(max_bytes=0, disk_dir=str(tmp_path), disk_max_bytes=150)
+    assert disk_files(tmp_path) == ['bb03.bin']
+    assert restarted.stats()['disk_bytes'] == 100
+
+
+def test_failed_write_leaves_no_temp_file(tmp_path, monkeypatch):
+    cache = AudioCache(max_bytes=0, disk_dir=str(tmp_path))
+
+    def broken_replace(src, dst):
+        raise OSError('disk full')
+
+    monkeypatch.setattr(os, 'replace', broken_replace)
+    cache.put('cc01', b'audio')
+    assert disk_files(tmp_path) == []
+    assert cache.stats()['disk_bytes'] == 0
@@ -0,0 +1,207 @@
+import threading
+import time
+
+import numpy as np
+import pytest
+
+from scheduler import InferenceScheduler, SchedulerStopped
+
+SAMPLE_RATE = 1000
+
+
+class FakeTTS:
+    """Stands in for melo.api.TTS: sentences are split on '.', each phone is one sample"""
+
+    language = 'EN'
+
+    class hps:
+        class data:
+            sampling_rate = SAMPLE_RATE
+
+    def __init__(self):
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def split_sentences_into_pieces(self, text, language, quiet=False, target_phones=None, first_target_phones=None):
+        return [t for t in text.split('.') if t]
+
+    def sentence_seeds(self, seed, n):
+        return None if seed is None else [seed + i for i in range(n)]
+
+    def get_text_features(self, text):
+        if text == 'bad':
+            raise ValueError('bad sentence')
+        return text
+
+    def get_text_features_batch(self, texts):
+        return [self.get_text_features(t) for t in texts]
+
+    def infer_features(self, features, speaker_id, sdp_ratio=0.2, noise_scale=0.6, noise_scale_w=0.8, speed=1.0, seed=None):
+        with self.lock:
+            self.batches.append((list(features), speed))
+        time.sleep(0.005)
+        return [np.full(len(f), 1.0 / speed, np.float32) for f in features]
+
+    @staticmethod
+    def audio_numpy_concat(segment_data_list, sr, speed=1.0):
+        silence = np.zeros(int(sr * 0.05 / speed), np.float32)
+        return np.concatenate([np.concatenate([s, silence]) for s in segment_data_list])
+
+
+@pytest.fixture
+def tts():
+    return FakeTTS()
+
+
+@pytest.fixture
+def scheduler(tts):
+    scheduler = InferenceScheduler(tts, max_batch=4, max_wait=0.05)
+    yield scheduler
+    scheduler.stop(timeout=2)
+    assert not scheduler._thread.is_alive()
+
+
+def expected_audio(text, speed=1.0):
+    return FakeTTS.audio_numpy_concat(
+        [np.full(len(t), 1.0 / speed, np.float32) for t in text.split('.') if t], SAMPLE_RATE, speed
+    )
+
+
+def test_batches_requests_with_the_same_settings(tts, scheduler):
+    futures = [scheduler.submit('aa.bbb', speed=1.0 if i % 2 == 0 else 2.0) for i in range(6)]
+    for i, future in enumerate(futures):
+        assert np.array_equal(future.result(timeout=5), expected_audio('aa.bbb', 1.0 if i % 2 == 0 else 2.0))
+    assert all(len(features) <= 4 for features, _ in tts.batches)
+    assert len(tts.batches) < 12
+    snapshot = scheduler.metrics.snapshot()
+    assert snapshot['requests'] == 6 and snapshot['sentences'] == 12
+
+
+def test_frontend_failure_fails_only_its_request(scheduler):
+    bad = scheduler.submit('x.bad')
+    good = scheduler.submit('x.yy')
+    with pytest.raises(ValueError):
+        bad.result(timeout=5)
+    assert np.array_equal(good.result(timeout=5), expected_audio('x.yy'))
+    assert scheduler.metrics.snapshot()['failed_requests'] == 1
+
+
+def test_empty_text_is_rejected(scheduler):
+    with pytest.raises(ValueError):
+        scheduler.submit('').result(timeout=5)
+    with pytest.raises(ValueError):
+        list(scheduler.submit_stream(''))
+
+
+def test_stream_matches_whole_request(scheduler):
+    whole = scheduler.submit('aa.bbb.c')
+    pieces = list(scheduler.submit_stream('aa.bbb.c'))
+    assert len(pieces) == 3
+    assert np.array_equal(np.concatenate(pieces), whole.result(timeout=5))
+    with pytest.raises(ValueError):
+        list(scheduler.submit_stream('a.bad.c'))
+
+
+def test_closed_stream_drops_its_sentences(tts, scheduler):
+    pieces = scheduler.submit_stream('a.' * 40)
+    next(pieces)
+    pieces.close()
+    scheduler.submit('z').result(timeout=5)
+    assert sum(len(features) for features, _ in tts.batches) < 40
+
+
+def test_worker_survives_consumer_finishing_first(scheduler, monkeypatch):
+    finish = scheduler._finish
+
+    def slow_finish(job):
+        # The stream consumer reads the last sentence and closes before the worker resolves the job
+        time.sleep(0.05)
+        finish(job)
+
+    monkeypatch.setattr(scheduler, '_finish', slow_finish)
+    assert len(list(scheduler.submit_stream('aa.bb'))) == 2
+    cancelled = scheduler.submit('aa.bb')
+    cancelled.cancel()
+    assert np.array_equal(scheduler.submit('cc').result(timeout=5), expected_audio('cc'))
+
+
+def test_worker_survives_a_failing_batch(tts, scheduler, monkeypatch):
+    def broken_concat(segment_data_list, sr, speed=1.0):
+        raise RuntimeError('concat failed')
+
+    monkeypatch.setattr(tts, 'audio_numpy_concat', broken_concat)
+    with pytest.raises(RuntimeError):
+        scheduler.submit('aa').result(timeout=5)
+    monkeypatch.undo()
+    assert np.array_equal(scheduler.submit('cc').result(timeout=5), expected_audio('cc'))
+
+
+def test_stop_finishes_queued_work_and_rejects_new(tts):
+    scheduler = InferenceScheduler(tts, max_batch=2, max_wait=0.01)
+    futures = [scheduler.submit('a.bb.ccc') for _ in range(3)]
+    scheduler.stop(timeout=5)
+    assert all(f.result(timeout=0).size for f in futures)
+    with pytest.raises(SchedulerStopped):
+        scheduler.submit('a')
+
+
+def small_model_tts():
+    """A melo TTS around a small randomly initialized model, with text features derived from the text"""
+    import torch
+    import torch.nn as nn
+    from melo.api import TTS
+    from melo.models import SynthesizerTrn
+    from melo.text.symbols import num_languages, num_tones, symbols
+
+    torch.manual_seed(0)
+    model = SynthesizerTrn(
+        len(symbols), 65, 32,
+        inter_channels=16, hidden_channels=16, filter_channels=32, n_heads=2, n_layers=3,
+        kernel_size=3, p_dropout=0.1, resblock='2', resblock_kernel_sizes=[3],
+        resblock_dilation_sizes=[[1, 3]], upsample_rates=[4, 4], upsample_initial_channel=16,
+        upsample_kernel_sizes=[8, 8], n_speakers=2, gin_channels=16, n_layers_trans_flow=3,
+        num_tones=num_tones, num_languages=num_languages,
+    ).eval()
+    tts = TTS.__new__(TTS)
+    nn.Module.__init__(tts)
+    tts.model = model
+    tts.device = 'cpu'
+    tts.language = 'EN'
+    tts.hps = type('hps', (), {'data': type('data', (), {'sampling_rate': SAMPLE_RATE, 'hop_length': 16})})
+
+    def get_text_features(text):
+        generator = torch.Generator().manual_seed(sum(map(ord, text)))
+        n = 3 * len(text)
+        phones = torch.randint(1, len(symbols), (n,), generator=generator)
+        return None, None, phones, torch.randint(0, num_tones, (n,), generator=generator), torch.full((n,), 2)
+
+    tts.split_sentences_into_pieces = FakeTTS().split_sentences_into_pieces
+    tts.get_text_features = get_text_features
+    tts.get_text_features_batch = lambda texts: [get_text_features(t) for t in texts]
+    return tts
+
+
+def test_seeded_audio_does_not_depend_on_batch_partners():
+    tts = small_model_tts()
+    infer_features = tts.infer_features
+    batch_sizes = []
+
+    def recording_infer_features(features, *args, **kwargs):
+        batch_sizes.append(len(features))
+        return infer_features(features, *args, **kwargs)
+
+    tts.infer_features = recording_infer_features
+    scheduler = InferenceScheduler(tts, max_batch=4, max_wait=0.2)
+    try:
+        alone = scheduler.submit('abc.defg', seed=42).result(timeout=60)
+        # Submitted together, the sentences of both requests share one batch
+        other = scheduler.submit('a much longer sentence.hi', seed=7)
+        batched = scheduler.submit('abc.defg', seed=42).result(timeout=60)
+        other.result(timeout=60)
+        streamed = np.concatenate(list(scheduler.submit_stream('abc.defg', seed=42)))
+    finally:
+        scheduler.stop(timeout=5)
+    assert batch_sizes[:2] == [2, 4]
+    # Equal up to float rounding, which can still flip the last bit of 16-bit samples
+    assert np.allclose(alone, batched, atol=1e-5)
+    assert np.allclose(alone, streamed, atol=1e-5)